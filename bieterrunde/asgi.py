@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "bieterrunde.settings")
 
+# Served via ASGI so the Server-Sent Events stream (`voting:events`) doesn't block a worker
 application = get_asgi_application()
+
+if settings.DEBUG:
+    # In production static files are served by whitenoise
+    application = ASGIStaticFilesHandler(application)
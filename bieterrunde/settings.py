@@ -173,3 +173,4 @@ PROJECT_VERSION = _get_version()
 CREATE_VOTING_ACCESS_CODE = os.environ.get("CREATE_VOTING_ACCESS_CODE")
 
 WEBLING_API_KEY = os.environ.get("WEBLING_API_KEY")
+WEBLING_API_BASE = os.environ.get("WEBLING_API_BASE", "https://owm.webling.ch/api/1")
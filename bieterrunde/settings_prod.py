@@ -57,6 +57,20 @@ TASKS = {
     },
 }
 
+# Valkey (Redis protocol) is shared with RQ, but uses its own database
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": (
+            f"redis://{os.environ.get('CACHE_HOST', os.environ.get('RQ_HOST'))}"
+            f":{os.environ.get('CACHE_PORT', '6379')}/1"
+        ),
+    },
+}
+
+# Every (guest) visitor has a session, keep polls from reading the session table
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+
 RQ_QUEUES = {
     "default": {
         "HOST": os.environ.get("RQ_HOST"),
@@ -0,0 +1,15 @@
+# ruff: noqa: F405
+import os
+
+from .settings import *  # noqa: F403
+
+# Run the test suite against a local Postgres, e.g. the `db` service from compose.yaml:
+#   uv run --group prod pytest --ds=bieterrunde.settings_test_postgres
+DATABASES["default"] = {
+    "ENGINE": "django.db.backends.postgresql",
+    "NAME": os.environ.get("DB_NAME", "bieterrunde"),
+    "USER": os.environ.get("DB_USER", "postgres"),
+    "PASSWORD": os.environ.get("DB_PASSWORD", ""),
+    "HOST": os.environ.get("DB_HOST", "localhost"),
+    "PORT": os.environ.get("DB_PORT", "5432"),
+}
@@ -13,7 +13,7 @@ case "$MODE" in
     uv run --group prod --no-group dev gunicorn "$@"
     ;;
   worker)
-    uv run --group prod --no-group dev manage.py rqworker --job-class django_tasks_rq.Job
+    uv run --group prod --no-group dev manage.py rqworker --with-scheduler --job-class django_tasks_rq.Job
     ;;
   *)
     echo "Unknown mode: $MODE"
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from voting.models import Voting, VotingRound, Bid, Vote, Voter, VotingVoter
+from voting.models import Voting, VotingRound, Bid, Vote, Voter, VotingVoter, WeblingExportEntry
 
 
 class BidInline(admin.TabularInline):
@@ -30,7 +30,7 @@ class VotingAdmin(admin.ModelAdmin):
 
 
 class VotingRoundAdmin(admin.ModelAdmin):
-    list_display = ("id", "voting", "round_number", "active")
+    list_display = ("id", "voting", "round_number", "active", "vote_count")
     inlines = [VoteInline]
 
 
@@ -53,9 +53,15 @@ class VotingVoterAdmin(admin.ModelAdmin):
     autocomplete_fields = ["voter", "voting"]
 
 
+class WeblingExportEntryAdmin(admin.ModelAdmin):
+    list_display = ("voting_round", "webling_id", "status", "updated_at")
+    list_filter = ("status", "voting_round")
+
+
 admin.site.register(Voter, VoterAdmin)
 admin.site.register(VotingVoter, VotingVoterAdmin)
 admin.site.register(Voting, VotingAdmin)
 admin.site.register(VotingRound, VotingRoundAdmin)
 admin.site.register(Vote, VoteAdmin)
 admin.site.register(Bid, BidAdmin)
+admin.site.register(WeblingExportEntry, WeblingExportEntryAdmin)
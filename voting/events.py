@@ -0,0 +1,117 @@
+"""Server-Sent Events for live round progress.
+
+Every process runs at most one poller per voting which reads the round tally once per
+interval and fans changes out to all connected clients. The number of open projector,
+phone and manager tabs therefore doesn't influence the database load.
+"""
+
+import asyncio
+import json
+from collections import defaultdict
+from logging import getLogger
+from weakref import WeakKeyDictionary
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+
+from voting.models import VotingRound
+
+log = getLogger(__name__)
+
+POLL_INTERVAL = 1
+KEEPALIVE_INTERVAL = 15
+
+EVENT_ROUND_STARTED = "round-started"
+EVENT_VOTE_CAST = "vote-cast"
+EVENT_ROUND_COMPLETED = "round-completed"
+
+RoundStates = dict[int, tuple[bool, int]]
+
+
+def fetch_round_states(voting_id) -> RoundStates:
+    """Return ``{round_id: (active, vote_count)}`` for all rounds of a voting."""
+    try:
+        return {
+            round_id: (active, vote_count)
+            for round_id, active, vote_count in VotingRound.objects.filter(
+                voting_id=voting_id
+            ).values_list("id", "active", "vote_count")
+        }
+    finally:
+        # Pollers live in long-running threads, don't keep idle connections around
+        connection.close()
+
+
+def diff_round_states(old: RoundStates, new: RoundStates) -> list[tuple[str, dict]]:
+    """Return the events that lead from `old` to `new`."""
+    events = []
+    for round_id, (active, vote_count) in new.items():
+        data = dict(round=round_id, votes=vote_count)
+        # A new round behaves like an active round without any votes
+        was_active, previous_vote_count = old.get(round_id, (True, 0))
+        if round_id not in old:
+            events.append((EVENT_ROUND_STARTED, data))
+        if vote_count != previous_vote_count:
+            events.append((EVENT_VOTE_CAST, data))
+        if was_active and not active:
+            events.append((EVENT_ROUND_COMPLETED, data))
+    return events
+
+
+def format_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class RoundEventHub:
+    """Per event loop registry of round pollers and their subscribers."""
+
+    _hubs: "WeakKeyDictionary[asyncio.AbstractEventLoop, RoundEventHub]" = WeakKeyDictionary()
+
+    def __init__(self):
+        self._subscribers: dict[str, set[asyncio.Queue]] = defaultdict(set)
+        self._pollers: dict[str, asyncio.Task] = {}
+
+    @classmethod
+    def for_current_loop(cls) -> "RoundEventHub":
+        loop = asyncio.get_running_loop()
+        if loop not in cls._hubs:
+            cls._hubs[loop] = cls()
+        return cls._hubs[loop]
+
+    async def stream(self, voting_id):
+        """Yield SSE formatted events for `voting_id` until the client disconnects."""
+        voting_id = str(voting_id)
+        queue = asyncio.Queue()
+        self._subscribers[voting_id].add(queue)
+        if voting_id not in self._pollers:
+            self._pollers[voting_id] = asyncio.create_task(self._poll(voting_id))
+        try:
+            # Tell the browser to reconnect quickly in case the connection drops
+            yield f"retry: {POLL_INTERVAL * 1000}\n\n"
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), KEEPALIVE_INTERVAL)
+                except TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            self._subscribers[voting_id].discard(queue)
+            if not self._subscribers[voting_id]:
+                del self._subscribers[voting_id]
+                self._pollers.pop(voting_id).cancel()
+
+    async def _poll(self, voting_id: str):
+        states = await sync_to_async(fetch_round_states, thread_sensitive=False)(voting_id)
+        while True:
+            await asyncio.sleep(POLL_INTERVAL)
+            try:
+                new_states = await sync_to_async(fetch_round_states, thread_sensitive=False)(
+                    voting_id
+                )
+            except Exception:
+                log.exception(f"Polling round states of voting {voting_id} failed")
+                continue
+            for event, data in diff_round_states(states, new_states):
+                message = format_event(event, data)
+                for queue in self._subscribers[voting_id]:
+                    queue.put_nowait(message)
+            states = new_states
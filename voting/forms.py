@@ -3,7 +3,6 @@ from decimal import Decimal
 from django.core.exceptions import ValidationError
 from django.forms import (
     ModelForm,
-    HiddenInput,
     TextInput,
     Form,
     FileField,
@@ -14,7 +13,7 @@ from django.forms import (
     RadioSelect,
 )
 
-from voting.models import Voting, Vote, Voter, VotingVoter
+from voting.models import Voting, Voter, VotingVoter
 
 
 class InvalidFormMixin:
@@ -35,16 +34,11 @@ class VotingForm(InvalidFormMixin, ModelForm):
         localized_fields = ["date"]
 
 
-class VoteForm(ModelForm):
-    class Meta:
-        model = Vote
-        fields = ["voting_round", "member_id", "amount"]
-        localized_fields = ["amount"]
-        widgets = {
-            "member_id": TextInput(attrs={"autofocus": True, "pattern": "[0-9]*"}),
-            # "amount": TextInput(attrs={"autofocus": True, "pattern": "[0-9]*"}),
-            "voting_round": HiddenInput(),
-        }
+class VoteForm(InvalidFormMixin, Form):
+    member_id = IntegerField(
+        label="Mitgliedsnummer", widget=TextInput(attrs={"autofocus": True, "pattern": "[0-9]*"})
+    )
+    amount = DecimalField(label="Beitrag", max_digits=10, decimal_places=2, localize=True)
 
 
 class BidImportForm(InvalidFormMixin, Form):
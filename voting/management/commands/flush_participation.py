@@ -0,0 +1,11 @@
+from django.core.management import BaseCommand
+
+from voting.tasks import flush_member_assembly_participation
+
+
+class Command(BaseCommand):
+    help = "Write pending member assembly participation changes to Webling, e.g. from cron."
+
+    def handle(self, *args, **options):
+        flush_member_assembly_participation.call()
+        self.stdout.write(self.style.SUCCESS("Flushed member assembly participation"))
@@ -1,17 +1,26 @@
 from functools import partial
 
 import djclick
+from django.conf import settings
 from django.core.management import CommandError
 from djclick.params import ModelInstance
 
-from voting.models import VotingRound, Voter
-from voting.utils.webling_api import WeblingAPI, PROP_MEMBER_ID, PROP_MISSING_VOTING_ROUNDS
+from voting.models import VotingRound, Voter, WeblingExportEntry
+from voting.utils.webling_api import (
+    WeblingAPI,
+    PROP_CONTRIBUTION,
+    PROP_MEMBER_ID,
+    PROP_MISSING_VOTING_ROUNDS,
+)
 
 _R = partial(djclick.style, fg="red")
 _G = partial(djclick.style, fg="green")
 _B = partial(djclick.style, fg="blue")
 _Y = partial(djclick.style, fg="yellow")
 
+# Number of exported members journaled at once
+JOURNAL_BATCH_SIZE = 50
+
 
 @djclick.command()
 @djclick.argument("voting-round-id", type=ModelInstance(VotingRound))
@@ -32,10 +41,34 @@ _Y = partial(djclick.style, fg="yellow")
 @djclick.option(
     "--override-average-contribution", type=int, help="Override average contribution value"
 )
+@djclick.option(
+    "--api-base",
+    help="Webling API base URL, by default loaded from settings",
+    envvar="WEBLING_API_BASE",
+)
+@djclick.option(
+    "--concurrency", type=int, default=8, show_default=True, help="Parallel requests to Webling"
+)
+@djclick.option(
+    "--rate-limit",
+    type=float,
+    default=10,
+    show_default=True,
+    help="Maximum requests per second to Webling, 0 to disable",
+)
+@djclick.option(
+    "--restart",
+    is_flag=True,
+    help="Export all members again instead of resuming a previous export of the voting round",
+)
 @djclick.option("-n", "--dry-run", is_flag=True, help="Do not actually export anything")
 def command(
     voting_round_id: VotingRound,
     api_key: str,
+    api_base: str | None,
+    concurrency: int,
+    rate_limit: float,
+    restart: bool,
     dry_run: bool,
     use_voters: bool,
     missing_voting_key_name: str,
@@ -48,7 +81,12 @@ def command(
         f"{_Y('Are you sure you want to export the voting round')} '{_G(voting_round_id)}'?",
         abort=True,
     )
-    api = WeblingAPI(api_key)
+    api = WeblingAPI(
+        api_key,
+        api_base or settings.WEBLING_API_BASE,
+        requests_per_second=rate_limit,
+        max_connections=concurrency,
+    )
     with api:
         if not use_voters:
             membergroups = api.fetch_membergroups()
@@ -72,13 +110,20 @@ def command(
 
             group_members = api.fetch_members_by_group_id(group_id)
         else:
-            voter_member_ids = ",".join(str(v.member_id) for v in Voter.objects.all())
-            group_members = api.fetch_members_by_filter(f"`Mitglieder ID` IN ({voter_member_ids})")
+            group_members = dict(
+                api.iter_members_by_mitglieder_ids(
+                    Voter.objects.values_list("member_id", flat=True).iterator()
+                )
+            )
 
         # The internal and "public" member IDs are different
-        group_member_member_ids = set(
-            member["properties"][PROP_MEMBER_ID] for member in group_members.values()
-        )
+        webling_ids = {
+            member["properties"][PROP_MEMBER_ID]: member_api_id
+            for member_api_id, member in group_members.items()
+        }
+        group_member_member_ids = set(webling_ids)
+        if not dry_run:
+            Voter.remember_webling_ids(webling_ids)
         voting_members = set(voting_round_id.votes.values_list("member_id", flat=True))
         superfluous_members = voting_members - group_member_member_ids
         if superfluous_members:
@@ -113,40 +158,66 @@ def command(
             for member_id, amount in voting_round_id.votes.values_list("member_id", "amount")
         }
 
-        new_contribution_values = {
-            member_api_id: votes.get(member["properties"][PROP_MEMBER_ID], average_contribution)
+        # Contribution and missing voting rounds are written with a single PUT per member
+        properties_by_member = {
+            member_api_id: member_properties(
+                member, votes, average_contribution, missing_voting_key_name
+            )
             for member_api_id, member in group_members.items()
         }
 
-        with djclick.progressbar(
-            new_contribution_values.items(), label=_Y("Exporting...")
-        ) as new_contribution_values_progress:
-            for member_api_id, amount in new_contribution_values_progress:
-                if not dry_run:
-                    api.update_member_contribution(member_api_id, amount)
-
-        non_voting_member_api_ids = [
-            member["id"]
-            for member in group_members.values()
-            if member["properties"][PROP_MEMBER_ID] not in voting_members
-        ]
-
-        if non_voting_member_api_ids:
-            with djclick.progressbar(
-                non_voting_member_api_ids, label=_Y("Updating non-voting members...")
-            ) as non_voting_member_api_ids_progress:
-                for member_api_id in non_voting_member_api_ids_progress:
-                    not_voted_assemblies = group_members[member_api_id]["properties"].get(
-                        PROP_MISSING_VOTING_ROUNDS
-                    )
-                    if not not_voted_assemblies:
-                        not_voted_assemblies = [missing_voting_key_name]
-                    else:
-                        not_voted_assemblies = list(
-                            set(not_voted_assemblies + [missing_voting_key_name])
-                        )
-                    if not dry_run:
-                        api.set_member_non_voting(member_api_id, not_voted_assemblies)
+        failed = {}
+        if not dry_run:
+            if restart:
+                voting_round_id.webling_export_entries.all().delete()
+            remaining = WeblingExportEntry.start(voting_round_id, properties_by_member)
+            if skipped := len(properties_by_member) - len(remaining):
+                djclick.echo(
+                    f"{_G('Resuming export,')} {_B(skipped)} {_G('members already exported')}"
+                )
+            done = []
+            try:
+                with djclick.progressbar(
+                    length=len(remaining), label=_Y("Exporting...")
+                ) as progress:
+                    for member_api_id, error in api.update_members_properties(
+                        remaining, max_workers=concurrency
+                    ):
+                        if error:
+                            failed[member_api_id] = str(error)
+                        else:
+                            done.append(member_api_id)
+                        if len(done) >= JOURNAL_BATCH_SIZE:
+                            WeblingExportEntry.finish(voting_round_id, done, {})
+                            done = []
+                        progress.update(1)
+            finally:
+                # Also journal the progress made before an abort, a re-run resumes from there
+                WeblingExportEntry.finish(voting_round_id, done, failed)
+
+        if failed:
+            djclick.secho("Export failed for members:", fg="red")
+            for member_api_id, error in sorted(failed.items()):
+                member_id = group_members[member_api_id]["properties"][PROP_MEMBER_ID]
+                djclick.secho(f"- {member_id} ({member_api_id}): {error}", fg="red")
+            raise CommandError(
+                f"Export failed for {len(failed)} members, run the command again to retry them"
+            )
 
+    djclick.echo(f"{_G('Webling API:')} {_B(api.metrics.summary())}")
     if dry_run:
         djclick.secho("DRY RUN - NO DATA HAS BEEN CHANGED", fg="red")
+
+
+def member_properties(
+    member: dict, votes: dict[int, int], average_contribution: int, missing_voting_key_name: str
+) -> dict:
+    """Return the Webling properties to write for `member` after the voting."""
+    member_id = member["properties"][PROP_MEMBER_ID]
+    if member_id in votes:
+        return {PROP_CONTRIBUTION: votes[member_id]}
+    not_voted_assemblies = member["properties"].get(PROP_MISSING_VOTING_ROUNDS) or []
+    return {
+        PROP_CONTRIBUTION: average_contribution,
+        PROP_MISSING_VOTING_ROUNDS: sorted(set(not_voted_assemblies + [missing_voting_key_name])),
+    }
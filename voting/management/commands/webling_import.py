@@ -7,7 +7,7 @@ from django.core.management import CommandError
 from django.conf import settings
 from voting.models import Voter
 from voting.utils.hmac_auth import compute_member_token
-from voting.utils.webling_api import WeblingAPI, PROP_BIETERRUNDE_AUTH_TOKEN
+from voting.utils.webling_api import WeblingAPI, PROP_BIETERRUNDE_AUTH_TOKEN, PROP_MEMBER_ID
 
 _R = partial(djclick.style, fg="red")
 _G = partial(djclick.style, fg="green")
@@ -31,9 +31,24 @@ _Y = partial(djclick.style, fg="yellow")
     type=str,
     help="Webling user filter expression, used instead of --webling-group-id",
 )
+@djclick.option(
+    "--concurrency", type=int, default=8, show_default=True, help="Parallel requests to Webling"
+)
+@djclick.option(
+    "--rate-limit",
+    type=float,
+    default=10,
+    show_default=True,
+    help="Maximum requests per second to Webling, 0 to disable",
+)
 @djclick.option("-n", "--dry-run", is_flag=True, help="Do not actually write anything")
 def command(
-    api_key: str | None, webling_group_id: int | None, webling_filter: str | None, dry_run: bool
+    api_key: str | None,
+    webling_group_id: int | None,
+    webling_filter: str | None,
+    concurrency: int,
+    rate_limit: float,
+    dry_run: bool,
 ):
     """Import Voter objects from Webling and write HMAC auth tokens back."""
     if webling_group_id and webling_filter:
@@ -49,7 +64,12 @@ def command(
     if not api_key:
         raise CommandError("Webling API key is required (either via settings or CLI parameter)")
 
-    api = WeblingAPI(api_key)
+    api = WeblingAPI(
+        api_key,
+        settings.WEBLING_API_BASE,
+        requests_per_second=rate_limit,
+        max_connections=concurrency,
+    )
     with api:
         if not webling_group_id and not webling_filter:
             membergroups = api.fetch_membergroups()
@@ -59,46 +79,56 @@ def command(
                     f"  - {_Y(group_id)}: {_G(group.title)} ({_B(len(group.members))} members)"
                 )
             webling_group_id = djclick.prompt("Select the member group to import from", type=int)
-            members = api.fetch_members_by_group_id(webling_group_id)
-        elif webling_filter:
-            members = api.fetch_members_by_filter(webling_filter)
-
-        if not members:
+        if webling_filter:
+            members = api.iter_members_by_filter(webling_filter)
+        else:
+            members = api.iter_members_by_group_id(webling_group_id)
+
+        names_by_member_id = {}
+        webling_ids_by_member_id = {}
+        token_updates = {}
+        for api_id, member in members:
+            props = member["properties"]
+            member_id = props[PROP_MEMBER_ID]
+            name_parts = [props.get("Vorname", ""), props.get("Name", "")]
+            names_by_member_id[member_id] = (
+                " ".join(p for p in name_parts if p) or f"Mitglied {member_id}"
+            )
+            webling_ids_by_member_id[member_id] = api_id
+            token = compute_member_token(member_id)
+            if props.get(PROP_BIETERRUNDE_AUTH_TOKEN) != token:
+                token_updates[api_id] = {PROP_BIETERRUNDE_AUTH_TOKEN: token}
+
+        if not names_by_member_id:
             djclick.secho("No members found", fg="red")
             sys.exit(1)
 
-        djclick.echo(f"{_G('Importing')} {_B(len(members))} {_G('members...')}")
-
-        created = 0
-        updated = 0
-        token_updated = 0
-
-        with djclick.progressbar(members.items(), label=_Y("Importing...")) as progress:
-            for api_id, member in progress:
-                props = member["properties"]
-                member_id = props["Mitglieder ID"]
-                name_parts = [props.get("Vorname", ""), props.get("Name", "")]
-                name = " ".join(p for p in name_parts if p) or f"Mitglied {member_id}"
-
-                if not dry_run:
-                    _, was_created = Voter.objects.update_or_create(
-                        member_id=member_id,
-                        defaults={"name": name},
-                    )
-                    if was_created:
-                        created += 1
-                    else:
-                        updated += 1
-
-                    # Compute and write auth token to Webling
-                    token = compute_member_token(member_id)
-                    if props[PROP_BIETERRUNDE_AUTH_TOKEN] != token:
-                        api.update_member_auth_token(api_id, token)
-                        token_updated += 1
+        djclick.echo(f"{_G('Importing')} {_B(len(names_by_member_id))} {_G('members...')}")
+
+        created = updated = token_updated = 0
+        if not dry_run:
+            created, updated = Voter.sync(names_by_member_id, webling_ids_by_member_id)
+
+            if token_updates:
+                failed = []
+                with djclick.progressbar(
+                    length=len(token_updates), label=_Y("Writing auth tokens...")
+                ) as progress:
+                    for api_id, error in api.update_members_properties(
+                        token_updates, max_workers=concurrency
+                    ):
+                        if error:
+                            failed.append((api_id, error))
+                        else:
+                            token_updated += 1
+                        progress.update(1)
+                for api_id, error in failed:
+                    djclick.secho(f"Writing auth token of {api_id} failed: {error}", fg="red")
 
         djclick.echo(
             f"\n{_G('Done.')} {_B(created)} {_G('created')}, {_B(updated)} {_G('updated')}, {_B(token_updated)} {_G('auth tokens updated')}."
         )
 
+    djclick.echo(f"{_G('Webling API:')} {_B(api.metrics.summary())}")
     if dry_run:
         djclick.secho("DRY RUN - NO DATA HAS BEEN CHANGED", fg="red")
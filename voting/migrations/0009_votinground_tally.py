@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:18
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_tally(apps, schema_editor):
+    VotingRound = apps.get_model("voting", "VotingRound")
+    VotingVoter = apps.get_model("voting", "VotingVoter")
+    for voting_round in VotingRound.objects.all():
+        tally = voting_round.votes.aggregate(count=Count("id"), sum=Sum("amount"))
+        absent_member_ids = VotingVoter.objects.filter(
+            voting_id=voting_round.voting_id,
+            absent_from_round__isnull=False,
+            absent_from_round__lte=voting_round.round_number,
+        ).values("voter__member_id")
+        voting_round.vote_count = tally["count"]
+        voting_round.vote_sum = tally["sum"] or 0
+        voting_round.absent_vote_count = voting_round.votes.filter(
+            member_id__in=absent_member_ids
+        ).count()
+        voting_round.save(update_fields=["vote_count", "vote_sum", "absent_vote_count"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("voting", "0008_alter_voting_date"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="votinground",
+            name="absent_vote_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Absenz-Stimmen"
+            ),
+        ),
+        migrations.AddField(
+            model_name="votinground",
+            name="vote_count",
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="Stimmen"),
+        ),
+        migrations.AddField(
+            model_name="votinground",
+            name="vote_sum",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                editable=False,
+                max_digits=12,
+                verbose_name="Stimmensumme",
+            ),
+        ),
+        migrations.RunPython(backfill_tally, migrations.RunPython.noop),
+    ]
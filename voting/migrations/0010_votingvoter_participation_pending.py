@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("voting", "0009_votinground_tally"),
+    ]
+
+    operations = [
+        # Existing participations have already been written to Webling
+        migrations.AddField(
+            model_name="votingvoter",
+            name="participation_pending",
+            field=models.BooleanField(
+                default=False, editable=False, verbose_name="Webling-Abgleich ausstehend"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="votingvoter",
+            name="participation_pending",
+            field=models.BooleanField(
+                default=True, editable=False, verbose_name="Webling-Abgleich ausstehend"
+            ),
+        ),
+    ]
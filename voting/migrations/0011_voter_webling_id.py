@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("voting", "0010_votingvoter_participation_pending"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="voter",
+            name="webling_id",
+            field=models.IntegerField(
+                blank=True, editable=False, null=True, verbose_name="Webling-ID"
+            ),
+        ),
+    ]
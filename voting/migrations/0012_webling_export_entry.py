@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("voting", "0011_voter_webling_id"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WeblingExportEntry",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("webling_id", models.IntegerField(verbose_name="Webling-ID")),
+                ("properties", models.JSONField(verbose_name="Eigenschaften")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Ausstehend"),
+                            ("done", "Exportiert"),
+                            ("failed", "Fehlgeschlagen"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                        verbose_name="Status",
+                    ),
+                ),
+                ("error", models.TextField(blank=True, verbose_name="Fehler")),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "voting_round",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="webling_export_entries",
+                        to="voting.votinground",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Webling-Export",
+                "verbose_name_plural": "Webling-Exporte",
+                "ordering": ["webling_id"],
+                "unique_together": {("voting_round", "webling_id")},
+            },
+        ),
+    ]
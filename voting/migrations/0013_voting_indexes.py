@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("voting", "0012_webling_export_entry"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="voting",
+            index=models.Index(fields=["owner", "-created_at"], name="voting_owner_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="votingvoter",
+            index=models.Index(
+                fields=["voting", "absent_from_round"], name="votingvoter_absence_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="votingvoter",
+            index=models.Index(
+                condition=models.Q(("participation_pending", True)),
+                fields=["id"],
+                name="votingvoter_pending_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:58
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_voter_counts(apps, schema_editor):
+    Voting = apps.get_model("voting", "Voting")
+    VotingVoter = apps.get_model("voting", "VotingVoter")
+    for voting in Voting.objects.all():
+        counts = dict(
+            VotingVoter.objects.filter(voting=voting)
+            .order_by()
+            .values_list("absent_from_round")
+            .annotate(count=Count("id"))
+        )
+        voting.voter_count = sum(counts.values())
+        voting.absence_counts = {
+            str(round_number): count
+            for round_number, count in counts.items()
+            if round_number is not None
+        }
+        voting.save(update_fields=["voter_count", "absence_counts"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("voting", "0013_voting_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="voting",
+            name="absence_counts",
+            field=models.JSONField(default=dict, editable=False, verbose_name="Absenzen"),
+        ),
+        migrations.AddField(
+            model_name="voting",
+            name="voter_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Teilnehmer"
+            ),
+        ),
+        migrations.RunPython(backfill_voter_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("voting", "0014_voting_voter_counts"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="voting",
+            name="roster_version",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("voting", "0015_voting_roster_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="votingvoter",
+            name="participation_changed_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                editable=False,
+                verbose_name="Teilnahme geändert",
+            ),
+        ),
+    ]
@@ -1,15 +1,19 @@
 import csv
 import uuid
-from contextlib import suppress
-from itertools import groupby
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
 from logging import getLogger
-from operator import attrgetter
 
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.db import models
-from django.db.models import Sum
-from django.db.transaction import atomic
+from django.db.models import Case, Count, Exists, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.lookups import GreaterThanOrEqual
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.db.transaction import atomic, on_commit
+from django.utils import timezone
+from django.utils.functional import cached_property
 
 
 log = getLogger(__name__)
@@ -21,6 +25,8 @@ class Voter(models.Model):
     id = models.AutoField(primary_key=True)
     member_id = models.IntegerField("Mitgliedsnummer", unique=True)
     name = models.CharField("Name", max_length=255)
+    # Webling's internal id, saves resolving the member id on every API write
+    webling_id = models.IntegerField("Webling-ID", null=True, blank=True, editable=False)
 
     class Meta:
         verbose_name = "Teilnehmer"
@@ -30,6 +36,43 @@ class Voter(models.Model):
     def __str__(self):
         return f"{self.name} (#{self.member_id})"
 
+    @classmethod
+    def sync(
+        cls, names_by_member_id: dict[int, str], webling_ids_by_member_id: dict[int, int]
+    ) -> tuple[int, int]:
+        """Create or update voters, skipping those which are unchanged.
+
+        Returns the number of created and updated voters.
+        """
+        existing = cls.objects.in_bulk(names_by_member_id, field_name="member_id")
+        changed = [
+            cls(member_id=member_id, name=name, webling_id=webling_ids_by_member_id.get(member_id))
+            for member_id, name in names_by_member_id.items()
+            if member_id not in existing
+            or existing[member_id].name != name
+            or existing[member_id].webling_id != webling_ids_by_member_id.get(member_id)
+        ]
+        if changed:
+            cls.objects.bulk_create(
+                changed,
+                update_conflicts=True,
+                unique_fields=["member_id"],
+                update_fields=["name", "webling_id"],
+            )
+        created = sum(1 for voter in changed if voter.member_id not in existing)
+        return created, len(changed) - created
+
+    @classmethod
+    def remember_webling_ids(cls, webling_ids_by_member_id: dict[int, int]) -> None:
+        """Store Webling ids learned from API responses on the matching voters."""
+        voters = cls.objects.filter(member_id__in=webling_ids_by_member_id)
+        changed = []
+        for voter in voters:
+            if voter.webling_id != webling_ids_by_member_id[voter.member_id]:
+                voter.webling_id = webling_ids_by_member_id[voter.member_id]
+                changed.append(voter)
+        cls.objects.bulk_update(changed, ["webling_id"])
+
 
 class Voting(models.Model):
     id = models.UUIDField(primary_key=True, editable=False, default=uuid.uuid4)
@@ -44,15 +87,43 @@ class Voting(models.Model):
     )
     date = models.DateTimeField("Datum")
     voters = models.ManyToManyField(Voter, through="VotingVoter", related_name="votings")
+    # Denormalized roster counters, only ever written through `update_voter_counts()`
+    voter_count = models.PositiveIntegerField("Teilnehmer", default=0, editable=False)
+    # Number of voters by the round they are absent from, keyed by the round number
+    absence_counts = models.JSONField("Absenzen", default=dict, editable=False)
+    # Bumped on every roster change, even those which leave the counters as they are
+    roster_version = models.PositiveIntegerField(default=0, editable=False)
+
+    VOTER_COUNT_FIELDS = ("voter_count", "absence_counts", "roster_version")
 
     class Meta:
         verbose_name = "Bieterrunde"
         verbose_name_plural = "Bieterrunden"
         ordering = ["-created_at"]
+        indexes = [
+            # The index view lists the votings of the logged in user
+            models.Index(fields=["owner", "-created_at"], name="voting_owner_created_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, force_insert=False, force_update=False, using=None, update_fields=None):
+        if update_fields is None and not self._state.adding:
+            # Never write back possibly stale in-memory roster counters
+            update_fields = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.VOTER_COUNT_FIELDS
+            ]
+        super().save(
+            *args,
+            force_insert=force_insert,
+            force_update=force_update,
+            using=using,
+            update_fields=update_fields,
+        )
+
     def clean(self):
         errors = {}
         if self.budget_goal < 1:
@@ -60,40 +131,90 @@ class Voting(models.Model):
         if errors:
             raise ValidationError(errors)
 
-    @property
-    def voter_count(self):
-        return self.voters.count()
+    @staticmethod
+    def update_voter_counts(voting_id) -> tuple[int, dict[str, int]]:
+        """Recount the roster of a voting, store and return the counters."""
+        with atomic(savepoint=False):
+            # Serialize concurrent recounts, so the last one to commit sees every change
+            list(Voting.objects.select_for_update().filter(pk=voting_id).values_list("pk"))
+            counts = dict(
+                VotingVoter.objects.filter(voting_id=voting_id)
+                .order_by()
+                .values_list("absent_from_round")
+                .annotate(count=Count("id"))
+            )
+            voter_count = sum(counts.values())
+            absence_counts = {
+                str(round_number): count
+                for round_number, count in counts.items()
+                if round_number is not None
+            }
+            Voting.objects.filter(pk=voting_id).update(
+                voter_count=voter_count,
+                absence_counts=absence_counts,
+                roster_version=F("roster_version") + 1,
+            )
+        return voter_count, absence_counts
 
-    @property
+    @staticmethod
+    def state_token(voting_id, owner=None) -> str | None:
+        """Cheap fingerprint of the live round and attendance state, `None` if unknown.
+
+        Everything is collected with a single query, so it can be used to answer
+        conditional requests without loading the voting. With `owner`, votings of other
+        users are unknown.
+        """
+        rounds = VotingRound.objects.filter(voting=OuterRef("pk")).order_by().values("voting")
+        votings = Voting.objects.filter(pk=voting_id)
+        if owner is not None:
+            votings = votings.filter(owner_id=owner.pk)
+        state = votings.values_list(
+            "roster_version",
+            "budget_goal",
+            "total_count",
+            Subquery(rounds.annotate(count=Count("id")).values("count")),
+            Subquery(rounds.annotate(votes=Sum("vote_count")).values("votes")),
+            Subquery(rounds.annotate(vote_sum=Sum("vote_sum")).values("vote_sum")),
+            Subquery(rounds.filter(active=True).values("id")),
+        ).first()
+        if state is None:
+            return None
+        return "-".join(str(value or 0) for value in state)
+
+    # Resolved once per instance (i.e. per request), until `invalidate_rounds()`
+    @cached_property
+    def round_list(self) -> list["VotingRound"]:
+        """All rounds in order, loaded with a single query."""
+        return list(self.rounds.order_by("round_number"))
+
+    @cached_property
     def active_round(self) -> "VotingRound | None":
-        with suppress(VotingRound.DoesNotExist):
-            return self.rounds.get(active=True)
-        return None
+        return next(
+            (voting_round for voting_round in self.round_list if voting_round.active), None
+        )
 
-    @property
+    @cached_property
     def active_or_last_round(self):
         if active := self.active_round:
             return active
-        return self.rounds.order_by("-round_number").first()
+        return self.round_list[-1] if self.round_list else None
+
+    def invalidate_rounds(self):
+        """Forget the memoized rounds, e.g. after starting or completing a round."""
+        for name in ("round_list", "active_round", "active_or_last_round"):
+            self.__dict__.pop(name, None)
 
     def present_voter_count(self, round_number=None):
         """Count of voters who are present (not absent) for the given round."""
-        qs = self.voting_voters.all()
-        if round_number:
-            return qs.filter(
-                models.Q(absent_from_round__isnull=True)
-                | models.Q(absent_from_round__gt=round_number)
-            ).count()
-        return qs.filter(absent_from_round__isnull=True).count()
+        return self.voter_count - self.absent_voter_count(round_number)
 
     def absent_voter_count(self, round_number=None):
         """Count of voters who are absent for the given round."""
-        qs = self.voting_voters.all()
-        if round_number:
-            return qs.filter(
-                absent_from_round__isnull=False, absent_from_round__lte=round_number
-            ).count()
-        return qs.filter(absent_from_round__isnull=False).count()
+        return sum(
+            count
+            for absent_from_round, count in self.absence_counts.items()
+            if not round_number or int(absent_from_round) <= round_number
+        )
 
     @property
     def local_voter_count(self):
@@ -122,6 +243,7 @@ class Voting(models.Model):
             active_round.save()
         round_number = self.rounds.count() + 1
         new_round = self.rounds.create(round_number=round_number, active=True)
+        self.invalidate_rounds()
         new_round.apply_absent_votes()
         return new_round
 
@@ -135,29 +257,87 @@ class Voting(models.Model):
 
     @atomic
     def import_bids_csv(self, csv_lines: list[str]):
+        """Import absent bids from CSV rows of the form `member_id, bid round 1, bid round 2, ...`.
+
+        The whole file is parsed and validated first, then bids, voters and their
+        participation are written with a handful of bulk statements.
+        """
         if self.rounds_started:
             raise ValueError(
                 "Gebote können nicht importiert werden, nachdem die erste Runde begonnen hat."
             )
-        for row in csv.reader(csv_lines, delimiter=";" if ";" in csv_lines[0] else ","):
+        bids = []
+        member_ids = []
+        reader = csv.reader(csv_lines, delimiter=";" if ";" in csv_lines[0] else ",")
+        for line_number, row in enumerate(reader, start=1):
             if not row or not row[0].isdigit():
                 # Skip empty lines, headers and/or comments
                 continue
             member_id = int(row[0])
+            member_ids.append(member_id)
             for round_number, amount in enumerate(row[1:], start=1):
                 if not amount:
                     continue
-                self.bids.create(member_id=member_id, round_number=round_number, amount=amount)
-            # Ensure voter exists and is linked to this voting, marked as absent
-            voter, _ = Voter.objects.get_or_create(
-                member_id=member_id,
-                defaults={"name": f"Mitglied {member_id}"},
-            )
-            VotingVoter.objects.get_or_create(
-                voting=self,
-                voter=voter,
-                defaults={"absent_from_round": 1},
-            )
+                try:
+                    amount = Decimal(amount)
+                except InvalidOperation:
+                    raise ValueError(
+                        f"Ungültiges Gebot '{amount}' in Zeile {line_number}."
+                    ) from None
+                bids.append(
+                    Bid(voting=self, member_id=member_id, round_number=round_number, amount=amount)
+                )
+        Bid.objects.bulk_create(bids)
+
+        # Ensure voters exist and are linked to this voting, marked as absent
+        Voter.objects.bulk_create(
+            [Voter(member_id=member_id, name=f"Mitglied {member_id}") for member_id in member_ids],
+            ignore_conflicts=True,
+        )
+        linked_voter_ids = set(self.voting_voters.values_list("voter_id", flat=True))
+        new_voting_voters = VotingVoter.objects.bulk_create(
+            VotingVoter(voting=self, voter=voter, absent_from_round=1)
+            for voter in Voter.objects.filter(member_id__in=member_ids)
+            if voter.id not in linked_voter_ids
+        )
+        if new_voting_voters:
+            from voting.tasks import schedule_participation_flush
+
+            on_commit(schedule_participation_flush)
+
+
+class VotingVoterQuerySet(models.QuerySet):
+    """Keeps the roster counters of the affected votings up to date on bulk writes.
+
+    Deletes of single rows and cascades (e.g. deleting a `Voter`) are handled by
+    `recount_voters_after_delete()`.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        # Update voting instances the caller holds, too
+        votings = {vv.voting_id: vv.voting for vv in objs if VotingVoter.voting.is_cached(vv)}
+        for voting_id in {vv.voting_id for vv in objs}:
+            counts = Voting.update_voter_counts(voting_id)
+            if voting := votings.get(voting_id):
+                voting.voter_count, voting.absence_counts = counts
+        return objs
+
+    def update(self, **kwargs):
+        if "absent_from_round" not in kwargs:
+            return super().update(**kwargs)
+        voting_ids = set(self.values_list("voting_id", flat=True))
+        rows = super().update(**kwargs)
+        for voting_id in voting_ids:
+            Voting.update_voter_counts(voting_id)
+        return rows
+
+    def delete(self):
+        voting_ids = set(self.values_list("voting_id", flat=True))
+        result = super().delete()
+        for voting_id in voting_ids:
+            Voting.update_voter_counts(voting_id)
+        return result
 
 
 class VotingVoter(models.Model):
@@ -169,12 +349,32 @@ class VotingVoter(models.Model):
     absent_from_round = models.IntegerField(
         "Abwesend ab Runde", null=True, blank=True, default=None
     )
+    # Set on every change, cleared once the participation has been written to Webling
+    participation_pending = models.BooleanField(
+        "Webling-Abgleich ausstehend", default=True, editable=False
+    )
+    # Decides which of a member's pending changes across votings is written to Webling
+    participation_changed_at = models.DateTimeField(
+        "Teilnahme geändert", default=timezone.now, editable=False
+    )
+
+    objects = VotingVoterQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Teilnahme"
         verbose_name_plural = "Teilnahmen"
         unique_together = ("voting", "voter")
         ordering = ["voter__member_id"]
+        indexes = [
+            # Present/absent counts and applying absent votes filter on the absence round
+            models.Index(fields=["voting", "absent_from_round"], name="votingvoter_absence_idx"),
+            # Only a handful of rows wait for the Webling flush at any time
+            models.Index(
+                fields=["id"],
+                condition=models.Q(participation_pending=True),
+                name="votingvoter_pending_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.voter} @ {self.voting}"
@@ -186,6 +386,10 @@ class VotingVoter(models.Model):
             )
 
     def save(self, *args, force_insert=False, force_update=False, using=None, update_fields=None):
+        self.participation_pending = True
+        self.participation_changed_at = timezone.now()
+        if update_fields is not None:
+            update_fields = {*update_fields, "participation_pending", "participation_changed_at"}
         super().save(
             *args,
             force_insert=force_insert,
@@ -193,9 +397,12 @@ class VotingVoter(models.Model):
             using=using,
             update_fields=update_fields,
         )
-        from voting.tasks import update_member_assembly_participation
+        self.voting.voter_count, self.voting.absence_counts = Voting.update_voter_counts(
+            self.voting_id
+        )
+        from voting.tasks import schedule_participation_flush
 
-        update_member_assembly_participation.enqueue(self.id)
+        on_commit(schedule_participation_flush)
 
     def is_absent_for_round(self, round_number: int) -> bool:
         return self.absent_from_round is not None and self.absent_from_round <= round_number
@@ -226,6 +433,14 @@ class VotingRound(models.Model):
     round_number = models.IntegerField("Runde")
     active = models.BooleanField("Aktiv")
     bids_applied = models.BooleanField("Gebote angewendet", default=False)
+    # Denormalized tally, only ever written through `add_to_tally()`
+    vote_count = models.PositiveIntegerField("Stimmen", default=0, editable=False)
+    vote_sum = models.DecimalField(
+        "Stimmensumme", max_digits=12, decimal_places=2, default=0, editable=False
+    )
+    absent_vote_count = models.PositiveIntegerField("Absenz-Stimmen", default=0, editable=False)
+
+    TALLY_FIELDS = ("vote_count", "vote_sum", "absent_vote_count")
 
     class Meta:
         verbose_name = "Abstimmungsrunde"
@@ -246,6 +461,13 @@ class VotingRound(models.Model):
     def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
         if self.is_complete:
             self.active = False
+        if update_fields is None and not self._state.adding:
+            # Never write back a possibly stale in-memory tally
+            update_fields = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.TALLY_FIELDS
+            ]
         return super().save(
             force_insert=force_insert,
             force_update=force_update,
@@ -253,6 +475,17 @@ class VotingRound(models.Model):
             update_fields=update_fields,
         )
 
+    def absent_member_ids(self) -> set[int]:
+        """Member ids of the voters who are absent in this round."""
+        return set(
+            VotingVoter.objects.filter(
+                voting_id=self.voting_id,
+                absent_from_round__isnull=False,
+                absent_from_round__lte=self.round_number,
+            ).values_list("voter__member_id", flat=True)
+        )
+
+    @atomic
     def apply_absent_votes(self):
         """Create Vote objects for all absent voters in this round.
 
@@ -261,54 +494,119 @@ class VotingRound(models.Model):
         if self.bids_applied:
             raise ValueError("Bids already applied")
 
-        # Group bids by member_id for quick lookup
-        bids_by_member_id = {
-            k: list(v)
-            for k, v in groupby(
-                self.voting.bids.all().order_by("member_id", "-round_number"),
-                key=attrgetter("member_id"),
+        # The most applicable bid is the one with the highest round_number <= current round
+        latest_bid = (
+            Bid.objects.filter(
+                voting_id=self.voting_id,
+                member_id=OuterRef("voter__member_id"),
+                round_number__lte=self.round_number,
             )
-        }
-
-        # Find all absent voters for this round
-        absent_voting_voters = self.voting.voting_voters.select_related("voter").filter(
-            absent_from_round__isnull=False,
-            absent_from_round__lte=self.round_number,
+            .order_by("-round_number")
+            .values("amount")[:1]
+        )
+        absent_voters = (
+            self.voting.voting_voters.filter(
+                absent_from_round__isnull=False,
+                absent_from_round__lte=self.round_number,
+            )
+            .order_by()
+            .values_list("voter__member_id", Subquery(latest_bid))
         )
 
-        for vv in absent_voting_voters:
-            member_id = vv.voter.member_id
-            bids = bids_by_member_id.get(member_id, [])
-
-            # Find the most applicable bid (highest round_number <= current round)
-            vote_amount = None
-            for bid in bids:
-                if bid.round_number <= self.round_number:
-                    vote_amount = bid.amount
-                    break
-
-            # If no bid found, use average
-            if vote_amount is None:
-                vote_amount = self.voting.average_contribution_target
-
-            Vote.objects.create(
+        # If no bid found, use average (rounded like the database will store it)
+        average_contribution_target = Decimal(self.voting.average_contribution_target).quantize(
+            Decimal("0.01")
+        )
+        votes = Vote.objects.bulk_create(
+            Vote(
                 voting_round=self,
                 member_id=member_id,
-                amount=vote_amount,
-            )
-            log.debug(
-                f"Applied absent vote for member {member_id} "
-                f"in round {self.round_number}: {vote_amount}"
+                amount=average_contribution_target if amount is None else amount,
             )
+            for member_id, amount in absent_voters
+        )
+        log.debug(f"Applied {len(votes)} absent votes in round {self.round_number}")
 
+        self.add_to_tally(
+            len(votes), sum(vote.amount for vote in votes), absent_vote_count=len(votes)
+        )
         self.bids_applied = True
         self.save()
 
+    @classmethod
+    def cast_vote(cls, voting_id, voting_round_id: int, member_id: int, amount: Decimal) -> "Vote":
+        """Record a vote in an active round, the last vote closes the round.
+
+        Raises `ValueError` if the round isn't open anymore or the member has already voted.
+        """
+        with atomic():
+            # Locking the round serializes concurrent votes with closing the round
+            voting_round = (
+                cls.objects.select_for_update(of=("self",))
+                .select_related("voting")
+                .filter(pk=voting_round_id, voting_id=voting_id, active=True)
+                .first()
+            )
+            if voting_round is None:
+                raise ValueError("Diese Abstimmungsrunde ist nicht mehr geöffnet.")
+            # No other vote can be inserted into the locked round meanwhile
+            if voting_round.votes.filter(member_id=member_id).exists():
+                raise ValueError("Mit dieser Mitgliedsnummer wurde bereits abgestimmt.")
+            # Closes the round with the last vote, see `add_to_tally()`
+            return Vote.objects.create(
+                voting_round=voting_round, member_id=member_id, amount=amount
+            )
+
+    def add_to_tally(self, vote_count, vote_sum, absent_vote_count=0):
+        """Atomically adjust the denormalized vote tally and refresh it on this instance.
+
+        The round is closed by the same statement once every voter has voted, so concurrent
+        last votes can neither both miss nor both trigger the completion.
+        """
+        voter_count = Voting.objects.filter(pk=OuterRef("voting")).values("voter_count")
+        was_active = self.active
+        VotingRound.objects.filter(pk=self.pk).update(
+            vote_count=F("vote_count") + vote_count,
+            vote_sum=F("vote_sum") + vote_sum,
+            absent_vote_count=F("absent_vote_count") + absent_vote_count,
+            # Column references see the values before this update
+            active=Case(
+                When(
+                    GreaterThanOrEqual(F("vote_count") + vote_count, Subquery(voter_count)),
+                    then=Value(False),
+                ),
+                default=F("active"),
+            ),
+        )
+        self.refresh_from_db(fields=[*self.TALLY_FIELDS, "active"])
+        if was_active and not self.active and VotingRound.voting.is_cached(self):
+            self.voting.invalidate_rounds()
+
+    @property
+    def version(self) -> str:
+        """Changes with everything the management view shows for this round.
+
+        Voter names are not part of it, fragments keyed on it need a timeout.
+        """
+        voting = self.voting
+        return "-".join(
+            str(value)
+            for value in (
+                self.vote_count,
+                self.vote_sum,
+                self.active,
+                voting.voter_count,
+                voting.roster_version,
+                voting.budget_goal,
+                voting.total_count,
+            )
+        )
+
     @property
     def is_complete(self):
         if self.id is None:
             return False
-        return self.votes.count() == self.voting.voter_count
+        return self.vote_count == self.voting.voter_count
 
     @property
     def is_active_or_last(self):
@@ -325,13 +623,13 @@ class VotingRound(models.Model):
     @property
     def local_vote_count(self):
         """Votes from present (in-person) voters only."""
-        return self.votes.count() - self.absent_voter_count
+        return self.vote_count - self.absent_vote_count
 
     @property
     def percent_complete(self):
         if self.voting.voter_count == 0:
             return 0
-        return self.votes.count() / self.voting.voter_count * 100
+        return self.vote_count / self.voting.voter_count * 100
 
     @property
     def percent_complete_local(self):
@@ -342,7 +640,12 @@ class VotingRound(models.Model):
 
     @property
     def budget_result(self):
-        vote_sum = self.votes.aggregate(sum=Sum("amount"))["sum"] or 0
+        """Compute the round result from the stored tally and the voter count.
+
+        This is plain arithmetic on columns that are kept up to date on every
+        write, so there is nothing to cache or invalidate.
+        """
+        vote_sum = self.vote_sum
         average_contribution_target = self.voting.average_contribution_target
         voter_count = self.voting.voter_count
         average_participants = self.voting.total_count - voter_count
@@ -360,6 +663,25 @@ class VotingRound(models.Model):
         return result
 
 
+class VoteQuerySet(models.QuerySet):
+    """Keeps the tally of the affected rounds up to date on bulk deletes."""
+
+    def delete(self):
+        votes_by_round = defaultdict(list)
+        for vote in self.select_related("voting_round"):
+            votes_by_round[vote.voting_round_id].append(vote)
+        result = super().delete()
+        for votes in votes_by_round.values():
+            voting_round = votes[0].voting_round
+            absent_member_ids = voting_round.absent_member_ids()
+            voting_round.add_to_tally(
+                -len(votes),
+                -sum(vote.amount for vote in votes),
+                -sum(vote.member_id in absent_member_ids for vote in votes),
+            )
+        return result
+
+
 class Vote(models.Model):
     id = models.AutoField(primary_key=True)
     datetime = models.DateTimeField(auto_now_add=True)
@@ -367,6 +689,8 @@ class Vote(models.Model):
     member_id = models.IntegerField("Mitgliedsnummer")
     amount = models.DecimalField("Beitrag", max_digits=10, decimal_places=2)
 
+    objects = VoteQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Stimme"
         verbose_name_plural = "Stimmen"
@@ -375,3 +699,136 @@ class Vote(models.Model):
 
     def __str__(self):
         return f"{self.member_id} - {self.amount}"
+
+    def save(self, *args, force_insert=False, force_update=False, using=None, update_fields=None):
+        with atomic(savepoint=False):
+            previous = None
+            if not self._state.adding:
+                # Edited votes (e.g. in the admin) are tallied against the stored row
+                previous = (
+                    Vote.objects.select_for_update(of=("self",))
+                    .select_related("voting_round")
+                    .filter(pk=self.pk)
+                    .first()
+                )
+            super().save(
+                *args,
+                force_insert=force_insert,
+                force_update=force_update,
+                using=using,
+                update_fields=update_fields,
+            )
+            if previous and (previous.voting_round_id, previous.member_id) == (
+                self.voting_round_id,
+                self.member_id,
+            ):
+                if previous.amount != self.amount:
+                    self.voting_round.add_to_tally(0, Decimal(self.amount) - previous.amount)
+                return
+            if previous:
+                previous.voting_round.add_to_tally(
+                    -1, -previous.amount, previous.absent_vote_count(-1)
+                )
+            self.voting_round.add_to_tally(1, self.amount, self.absent_vote_count(1))
+
+    def delete(self, using=None, keep_parents=False):
+        with atomic(savepoint=False):
+            result = super().delete(using=using, keep_parents=keep_parents)
+            self.voting_round.add_to_tally(-1, -self.amount, self.absent_vote_count(-1))
+        return result
+
+    def absent_vote_count(self, count: int) -> Case:
+        """`count` if the member is absent in the round of this vote, else 0.
+
+        Evaluated by the tally update itself, so it doesn't cost a query of its own.
+        """
+        voting_round = self.voting_round
+        absent = VotingVoter.objects.filter(
+            voting_id=voting_round.voting_id,
+            voter__member_id=self.member_id,
+            absent_from_round__isnull=False,
+            absent_from_round__lte=voting_round.round_number,
+        )
+        return Case(When(Exists(absent), then=Value(count)), default=Value(0))
+
+
+class WeblingExportEntry(models.Model):
+    """Journal of the Webling updates of a voting round export, allows resuming it."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Ausstehend"
+        DONE = "done", "Exportiert"
+        FAILED = "failed", "Fehlgeschlagen"
+
+    id = models.AutoField(primary_key=True)
+    voting_round = models.ForeignKey(
+        VotingRound, on_delete=models.CASCADE, related_name="webling_export_entries"
+    )
+    webling_id = models.IntegerField("Webling-ID")
+    properties = models.JSONField("Eigenschaften")
+    status = models.CharField("Status", max_length=10, choices=Status, default=Status.PENDING)
+    error = models.TextField("Fehler", blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Webling-Export"
+        verbose_name_plural = "Webling-Exporte"
+        ordering = ["webling_id"]
+        unique_together = ("voting_round", "webling_id")
+
+    def __str__(self):
+        return f"{self.voting_round} - {self.webling_id}: {self.get_status_display()}"
+
+    @classmethod
+    def start(cls, voting_round: VotingRound, properties_by_member: dict[int, dict]) -> dict:
+        """Journal an export and return the updates which haven't been done yet.
+
+        Members already exported with the same properties are skipped, all others are
+        (re)journaled as pending.
+        """
+        done = dict(
+            cls.objects.filter(voting_round=voting_round, status=cls.Status.DONE).values_list(
+                "webling_id", "properties"
+            )
+        )
+        remaining = {
+            webling_id: properties
+            for webling_id, properties in properties_by_member.items()
+            if done.get(webling_id) != properties
+        }
+        cls.objects.bulk_create(
+            [
+                cls(voting_round=voting_round, webling_id=webling_id, properties=properties)
+                for webling_id, properties in remaining.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["voting_round", "webling_id"],
+            update_fields=["properties", "status", "error", "updated_at"],
+        )
+        return remaining
+
+    @classmethod
+    def finish(cls, voting_round: VotingRound, done: list[int], failed: dict[int, str]) -> None:
+        """Record the outcome of exported members."""
+        entries = cls.objects.filter(voting_round=voting_round)
+        now = timezone.now()
+        if done:
+            entries.filter(webling_id__in=done).update(
+                status=cls.Status.DONE, error="", updated_at=now
+            )
+        for webling_id, error in failed.items():
+            entries.filter(webling_id=webling_id).update(
+                status=cls.Status.FAILED, error=error, updated_at=now
+            )
+
+
+@receiver(post_delete, sender=VotingVoter)
+def recount_voters_after_delete(sender, instance, origin, **kwargs):
+    """Recount the roster after a voting voter has been deleted, also by a cascade."""
+    origin_model = origin.model if isinstance(origin, models.QuerySet) else type(origin)
+    if origin_model is Voting or isinstance(origin, VotingVoterQuerySet):
+        # The voting is gone as well, or the queryset recounts once per voting
+        return
+    counts = Voting.update_voter_counts(instance.voting_id)
+    if VotingVoter.voting.is_cached(instance):
+        instance.voting.voter_count, instance.voting.absence_counts = counts
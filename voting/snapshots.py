@@ -0,0 +1,45 @@
+from dataclasses import dataclass, field
+from operator import itemgetter
+
+from voting.models import VotingRound
+
+
+@dataclass
+class RoundSnapshot:
+    """Everything the round management view shows, resolved up front."""
+
+    voting_round: VotingRound
+    voter_entries: list[dict] = field(default_factory=list)
+    budget_result: dict = field(default_factory=dict)
+    is_complete: bool = False
+    is_active_or_last: bool = False
+
+
+def build_round_snapshot(voting_round: VotingRound) -> RoundSnapshot:
+    """Build a `RoundSnapshot` with a fixed number of queries, independent of the voter count."""
+    voting = voting_round.voting
+    average_contribution_target = voting.average_contribution_target
+    votes_by_member = {v.member_id: v for v in voting_round.votes.all()}
+    voter_entries = []
+    for vv in voting.voting_voters.select_related("voter").all():
+        vote = votes_by_member.get(vv.voter.member_id)
+        voter_entries.append(
+            {
+                "member_id": vv.voter.member_id,
+                "voter": vv.voter,
+                "voting_voter": vv,
+                "vote": vote,
+                "has_voted": vote is not None,
+                "below_target": vote is not None and vote.amount < average_contribution_target,
+            }
+        )
+    # Non-voters first, then voters; within each group sorted by member_id
+    voter_entries.sort(key=itemgetter("has_voted", "member_id"))
+
+    return RoundSnapshot(
+        voting_round=voting_round,
+        voter_entries=voter_entries,
+        budget_result=voting_round.budget_result,
+        is_complete=voting_round.is_complete,
+        is_active_or_last=voting_round.is_active_or_last,
+    )
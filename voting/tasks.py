@@ -1,21 +1,110 @@
+from datetime import timedelta
+from http import HTTPStatus
+from itertools import groupby
+from operator import attrgetter
+
+import httpx
 from django.conf import settings
+from django.core.cache import cache
 from django_tasks import task
+from django.utils import timezone
 
-from voting.models import VotingVoter
+from voting.models import Voter, VotingVoter
 from logging import getLogger
 
-from voting.utils.webling_api import WeblingAPI
+from voting.utils.webling_api import WeblingAPI, assembly_participation_properties
 
 log = getLogger(__name__)
 
+# Participation changes within this window are written to Webling by a single flush
+PARTICIPATION_FLUSH_DELAY = 10
+PARTICIPATION_FLUSH_SCHEDULED_KEY = "voting:participation-flush-scheduled"
 
-@task()
-def update_member_assembly_participation(voting_voter_id: int) -> None:
-    vv = VotingVoter.objects.get(id=voting_voter_id)
-    with WeblingAPI(settings.WEBLING_API_KEY) as api:
-        member_id = api.get_member_id_by_mitglieder_id(vv.voter.member_id)
-        is_participating = vv.absent_from_round is None
-        api.update_member_assembly_participation(member_id, is_participating)
-        log.info(
-            f"Updated member assembly participation {vv.voter.member_id} ({member_id}) -> {is_participating}"
+
+def schedule_participation_flush() -> None:
+    """Enqueue `flush_member_assembly_participation` unless a flush is already scheduled."""
+    # The marker expires eventually, so a lost job doesn't block flushing forever
+    if not cache.add(PARTICIPATION_FLUSH_SCHEDULED_KEY, True, PARTICIPATION_FLUSH_DELAY * 6):
+        return
+    flush = flush_member_assembly_participation
+    if flush.get_backend().supports_defer:
+        flush = flush.using(
+            run_after=timezone.now() + timedelta(seconds=PARTICIPATION_FLUSH_DELAY)
         )
+    flush.enqueue()
+
+
+@task()
+def flush_member_assembly_participation() -> None:
+    """Write all pending participation changes to Webling using one API client.
+
+    Members which fail stay pending and are retried by the next flush.
+    """
+    # Changes from now on need another flush
+    cache.delete(PARTICIPATION_FLUSH_SCHEDULED_KEY)
+    if not settings.WEBLING_API_KEY:
+        log.warning("WEBLING_API_KEY is not set, not writing member assembly participation")
+        return
+    # Changes saved from now on are left pending for the next flush
+    loaded_at = timezone.now()
+    pending = list(
+        VotingVoter.objects.filter(participation_pending=True)
+        .select_related("voter")
+        .order_by("id")
+    )
+    if not pending:
+        return
+
+    with WeblingAPI(settings.WEBLING_API_KEY, settings.WEBLING_API_BASE) as api:
+        member_ids = {
+            vv.voter.member_id: vv.voter.webling_id for vv in pending if vv.voter.webling_id
+        }
+        if unresolved := {vv.voter.member_id for vv in pending} - member_ids.keys():
+            resolved = api.get_member_ids_by_mitglieder_ids(sorted(unresolved))
+            Voter.remember_webling_ids(resolved)
+            member_ids.update(resolved)
+        # A voter might take part in several votings, the most recent change wins
+        latest = {
+            vv.voter.member_id: vv
+            for vv in sorted(pending, key=attrgetter("participation_changed_at"))
+        }
+        for missing in latest.keys() - member_ids.keys():
+            log.error(f"Mitglieder ID {missing} does not exist in Webling")
+        updates = {
+            member_ids[mitglieder_id]: assembly_participation_properties(
+                vv.absent_from_round is None
+            )
+            for mitglieder_id, vv in latest.items()
+            if mitglieder_id in member_ids
+        }
+        synced = set()
+        unknown = set()
+        for member_id, error in api.update_members_properties(updates):
+            if error:
+                log.error(f"Updating member assembly participation of {member_id} failed: {error}")
+                if (
+                    isinstance(error, httpx.HTTPStatusError)
+                    and error.response.status_code == HTTPStatus.NOT_FOUND
+                ):
+                    unknown.add(member_id)
+            else:
+                synced.add(member_id)
+
+    if unknown:
+        # E.g. re-created in Webling, the next flush looks these members up again
+        Voter.objects.filter(webling_id__in=unknown).update(webling_id=None)
+
+    synced_mitglieder_ids = {m for m, member_id in member_ids.items() if member_id in synced}
+    synced_voting_voters = [vv for vv in pending if vv.voter.member_id in synced_mitglieder_ids]
+    key = attrgetter("absent_from_round")
+    for absent_from_round, voting_voters in groupby(
+        sorted(synced_voting_voters, key=lambda vv: key(vv) or 0), key=key
+    ):
+        # Older changes of the same member are superseded by the one written. Only clear the
+        # flag if the voter hasn't changed in the meantime.
+        VotingVoter.objects.filter(
+            id__in=[vv.id for vv in voting_voters],
+            absent_from_round=absent_from_round,
+            participation_changed_at__lte=loaded_at,
+        ).update(participation_pending=False)
+    log.info(f"Updated member assembly participation of {len(synced)} members")
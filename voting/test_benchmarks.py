@@ -0,0 +1,216 @@
+"""Query count and latency benchmarks for the hot paths of a live assembly.
+
+Skipped unless ``BENCHMARK=1`` is set, e.g.::
+
+    BENCHMARK=1 uv run pytest voting/test_benchmarks.py
+    BENCHMARK=1 uv run --group prod pytest voting/test_benchmarks.py \
+        --ds=bieterrunde.settings_test_postgres
+
+Every scenario is run for each roster size in ``BENCHMARK_SIZES`` (default ``50,500,5000``).
+The number of queries per request must not grow with the roster size and must stay within
+the budget below; latencies are only reported. Bulk inserts which the database backend
+splits into several batches (SQLite limits the number of parameters) count as one query.
+"""
+
+import datetime
+import os
+import re
+import statistics
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from voting.models import Bid, Vote, Voter, Voting, VotingRound, VotingVoter
+
+pytestmark = [
+    pytest.mark.skipif(not os.environ.get("BENCHMARK"), reason="BENCHMARK=1 not set"),
+    pytest.mark.django_db,
+]
+
+SIZES = [int(size) for size in os.environ.get("BENCHMARK_SIZES", "50,500,5000").split(",")]
+ITERATIONS = int(os.environ.get("BENCHMARK_ITERATIONS", "20"))
+
+# Maximum number of queries per request, independent of the roster size
+QUERY_BUDGET = {
+    "vote": 8,
+    "manage-poll": 9,
+    "info-poll": 3,
+    "new-round": 19,
+    "import-bids": 11,
+}
+
+
+def count_queries(queries: list[dict]) -> int:
+    """Count queries, treating consecutive inserts into the same table as one."""
+    count = 0
+    previous_insert = None
+    for query in queries:
+        insert = re.match(r'INSERT (?:OR IGNORE )?INTO "?(\w+)"?', query["sql"])
+        table = insert and insert.group(1)
+        if not table or table != previous_insert:
+            count += 1
+        previous_insert = table
+    return count
+
+
+@dataclass
+class Measurement:
+    scenario: str
+    size: int
+    durations: list[float] = field(default_factory=list)
+    query_counts: list[int] = field(default_factory=list)
+
+    def measure(self, func, *args, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            self.durations.append(time.perf_counter() - start)
+        self.query_counts.append(count_queries(queries.captured_queries))
+        return result
+
+    def percentile(self, percent: int) -> float:
+        if len(self.durations) == 1:
+            return self.durations[0]
+        return statistics.quantiles(self.durations, n=100, method="inclusive")[percent - 1]
+
+    def report(self) -> str:
+        return (
+            f"{self.scenario:<12} N={self.size:<6} "
+            f"queries={max(self.query_counts):<4} "
+            f"p50={self.percentile(50) * 1000:8.2f}ms "
+            f"p99={self.percentile(99) * 1000:8.2f}ms"
+        )
+
+
+@pytest.fixture
+def measurement(request, capsys):
+    size = request.node.callspec.params["size"]
+    scenario = request.node.originalname.removeprefix("test_").replace("_", "-")
+    measurement = Measurement(scenario=scenario, size=size)
+    yield measurement
+    with capsys.disabled():
+        print(f"\n{measurement.report()}")
+    assert max(measurement.query_counts) <= QUERY_BUDGET[scenario], measurement.report()
+
+
+@pytest.fixture
+def owner(db):
+    return User.objects.create_user("benchmark-owner")
+
+
+def seed_voting(owner, size: int, start_round=True) -> Voting:
+    """Create a voting with `size` voters, 10% of them absent with bids, half of the rest voted."""
+    voting = Voting.objects.create(
+        name="Benchmark",
+        budget_goal=Decimal(100 * size),
+        total_count=size + size // 10,
+        owner=owner,
+        date=timezone.now() + datetime.timedelta(days=1),
+    )
+    Voter.objects.bulk_create(
+        [Voter(member_id=member_id, name=f"Mitglied {member_id}") for member_id in range(size)],
+        ignore_conflicts=True,
+    )
+    absent_member_ids = set(range(0, size, 10))
+    VotingVoter.objects.bulk_create(
+        VotingVoter(
+            voting=voting,
+            voter=voter,
+            absent_from_round=1 if voter.member_id in absent_member_ids else None,
+        )
+        for voter in Voter.objects.filter(member_id__lt=size)
+    )
+    Bid.objects.bulk_create(
+        Bid(voting=voting, member_id=member_id, round_number=1, amount=Decimal("90"))
+        for member_id in absent_member_ids
+    )
+    if start_round:
+        voting_round = voting.new_round()
+        present_member_ids = [m for m in range(size) if m not in absent_member_ids]
+        cast_bulk_votes(voting_round, present_member_ids[: len(present_member_ids) // 2])
+    return voting
+
+
+def cast_bulk_votes(voting_round: VotingRound, member_ids):
+    votes = Vote.objects.bulk_create(
+        Vote(voting_round=voting_round, member_id=member_id, amount=Decimal("100"))
+        for member_id in member_ids
+    )
+    voting_round.add_to_tally(len(votes), sum(vote.amount for vote in votes))
+
+
+def pending_member_ids(voting_round: VotingRound) -> list[int]:
+    voted = set(voting_round.votes.values_list("member_id", flat=True))
+    return [
+        member_id
+        for member_id in voting_round.voting.voters.values_list("member_id", flat=True)
+        if member_id not in voted
+    ]
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_vote(client, owner, size, measurement):
+    voting = seed_voting(owner, size)
+    voting_round = voting.active_round
+    url = reverse(
+        "voting:vote-submit",
+        kwargs={"voting_id": voting.id, "voting_round_id": voting_round.id},
+    )
+    for member_id in pending_member_ids(voting_round)[:ITERATIONS]:
+        response = measurement.measure(
+            client.post,
+            url,
+            {"member_id": member_id, "amount": "100"},
+            HTTP_HX_REQUEST="true",
+        )
+        assert response.status_code == 200
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_manage_poll(client, owner, size, measurement):
+    voting = seed_voting(owner, size)
+    client.force_login(owner)
+    url = reverse("voting:manage", args=[voting.id])
+    for _ in range(ITERATIONS):
+        response = measurement.measure(client.get, url, HTTP_HX_REQUEST="true")
+        assert response.status_code == 200
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_info_poll(client, owner, size, measurement):
+    voting = seed_voting(owner, size)
+    url = reverse("voting:info", args=[voting.id])
+    for _ in range(ITERATIONS):
+        response = measurement.measure(
+            client.get, url, HTTP_HX_REQUEST="true", HTTP_HX_TRIGGER="round-info"
+        )
+        assert response.status_code == 200
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_new_round(client, owner, size, measurement):
+    voting = seed_voting(owner, size)
+    client.force_login(owner)
+    url = reverse("voting:new-round", args=[voting.id])
+    for _ in range(min(ITERATIONS, 5)):
+        voting_round = voting.active_round
+        cast_bulk_votes(voting_round, pending_member_ids(voting_round))
+        response = measurement.measure(client.post, url)
+        assert response.status_code == 302
+    assert voting.rounds.count() == min(ITERATIONS, 5) + 1
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_import_bids(owner, size, measurement):
+    csv_lines = [f"{member_id};80;90;100" for member_id in range(size)]
+    for _ in range(min(ITERATIONS, 5)):
+        voting = seed_voting(owner, 0, start_round=False)
+        measurement.measure(voting.import_bids_csv, csv_lines)
+        assert voting.bids.count() == 3 * size
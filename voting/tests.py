@@ -1,17 +1,51 @@
+import asyncio
 import datetime
 import io
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import nullcontext
 from decimal import Decimal
 
+import httpx
 import pytest
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError
+from django.db import IntegrityError, connection
+from django.db.models import F
+from django.template import Context, Template
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 
-from voting.models import Bid, Vote, Voter, Voting, VotingVoter
+from voting.events import diff_round_states, fetch_round_states
+from voting.management.commands.webling_export import member_properties
+from voting.models import (
+    Bid,
+    Vote,
+    Voter,
+    Voting,
+    VotingRound,
+    VotingVoter,
+    WeblingExportEntry,
+)
+from voting.snapshots import build_round_snapshot
+from voting.tasks import flush_member_assembly_participation
 from voting.utils.hmac_auth import compute_member_token, verify_member_token
+from voting.utils.webling_api import (
+    PROP_CONTRIBUTION,
+    PROP_MEMBER_ID,
+    PROP_MISSING_VOTING_ROUNDS,
+    AsyncWeblingAPI,
+    WeblingAPI,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Primary keys are reused between tests, don't let cached fragments leak
+    cache.clear()
 
 
 def make_voter(member_id, name=None):
@@ -392,6 +426,40 @@ def test_voting_vote_post_saves_vote(client, owner, voting):
     assert round.votes.filter(member_id=1, amount=42).exists()
 
 
+@pytest.mark.django_db
+def test_voting_vote_submit_htmx_returns_fragment(client, voting, django_assert_max_num_queries):
+    round = voting.new_round()
+    url = reverse("voting:vote-submit", args=[voting.id, round.id])
+    # Lock the round, check for a previous vote, insert, update and refresh the tally, count
+    # the voters plus the transaction's savepoint statements
+    with django_assert_max_num_queries(8):
+        response = client.post(url, {"member_id": 1, "amount": "42"}, HTTP_HX_REQUEST="true")
+    assert response.status_code == 200
+    content = response.content.decode()
+    assert "Deine Stimme wurde gespeichert." in content
+    assert 'hx-swap-oob="true"' in content
+    assert round.votes.filter(member_id=1, amount=42).exists()
+
+    response = client.post(url, {"member_id": 1, "amount": "50"}, HTTP_HX_REQUEST="true")
+    assert "bereits abgestimmt" in response.content.decode()
+    assert round.votes.get(member_id=1).amount == 42
+
+
+@pytest.mark.django_db
+def test_voting_vote_submit_last_vote_closes_round(client, voting):
+    round = voting.new_round()
+    Vote.objects.create(voting_round=round, member_id=2, amount=50)
+    url = reverse("voting:vote-submit", args=[voting.id, round.id])
+    response = client.post(url, {"member_id": 1, "amount": "50"}, HTTP_HX_REQUEST="true")
+    assert "keine Abstimmungsrunde geöffnet" in response.content.decode()
+    round.refresh_from_db()
+    assert round.active is False
+
+    response = client.post(url, {"member_id": 3, "amount": "50"}, HTTP_HX_REQUEST="true")
+    assert "nicht mehr geöffnet" in response.content.decode()
+    assert round.votes.count() == 2
+
+
 @pytest.mark.django_db
 def test_voting_export_csv(client, owner, voting):
     client.force_login(owner)
@@ -774,3 +842,981 @@ def test_voting_voter_model_clean_allows_before_round_started(voting):
     new_voter = make_voter(701, "Early Bird")
     vv = VotingVoter(voting=voting, voter=new_voter)
     vv.full_clean()  # must not raise
+
+
+# ---------------------------------------------------------------------------
+# Denormalized round tally
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.django_db
+def test_round_tally_tracks_votes(voting):
+    VotingVoter.objects.create(voting=voting, voter=make_voter(3), absent_from_round=1)
+    voting.bids.create(member_id=3, round_number=1, amount=Decimal("30"))
+    round = voting.new_round()
+    assert (round.vote_count, round.vote_sum, round.absent_vote_count) == (1, 30, 1)
+    assert round.local_vote_count == 0
+
+    vote = Vote.objects.create(voting_round=round, member_id=1, amount=Decimal("40"))
+    assert (round.vote_count, round.vote_sum) == (2, 70)
+    assert round.local_vote_count == 1
+    assert round.is_complete is False
+
+    vote.delete()
+    round.refresh_from_db()
+    assert (round.vote_count, round.vote_sum) == (1, 30)
+
+
+@pytest.mark.django_db
+def test_round_tally_tracks_edited_and_deleted_votes(voting):
+    VotingVoter.objects.create(voting=voting, voter=make_voter(3), absent_from_round=1)
+    voting.bids.create(member_id=3, round_number=1, amount=Decimal("30"))
+    round = voting.new_round()
+    vote = Vote.objects.create(voting_round=round, member_id=1, amount=Decimal("10"))
+    vote.amount = Decimal("50")
+    vote.save()
+    round.refresh_from_db()
+    assert (round.vote_count, round.vote_sum, round.absent_vote_count) == (2, 80, 1)
+
+    round.votes.get(member_id=3).delete()
+    round.refresh_from_db()
+    assert (round.vote_count, round.vote_sum, round.absent_vote_count) == (1, 50, 0)
+    assert round.local_vote_count == 1
+
+    # Re-adding the absent vote counts it as absent again
+    Vote.objects.create(voting_round=round, member_id=3, amount=Decimal("30"))
+    round.refresh_from_db()
+    assert (round.vote_count, round.absent_vote_count) == (2, 1)
+
+    # E.g. "delete selected" in the admin
+    Vote.objects.filter(voting_round=round).delete()
+    round.refresh_from_db()
+    assert (round.vote_count, round.vote_sum, round.absent_vote_count) == (0, 0, 0)
+
+
+@pytest.mark.django_db
+def test_round_save_does_not_overwrite_tally(voting):
+    round = voting.new_round()
+    stale = voting.rounds.get(pk=round.pk)
+    cast_votes(round, [10, 20])
+    stale.save()
+    stale.refresh_from_db()
+    assert (stale.vote_count, stale.vote_sum) == (2, 30)
+
+
+# ---------------------------------------------------------------------------
+# Denormalized roster counters
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.django_db
+def test_voter_counts_track_roster_changes(voting):
+    assert (voting.voter_count, voting.absence_counts) == (2, {})
+    voting_voter = VotingVoter.objects.create(
+        voting=voting, voter=make_voter(3), absent_from_round=2
+    )
+    assert (voting.voter_count, voting.absence_counts) == (3, {"2": 1})
+    assert (voting.present_voter_count(1), voting.absent_voter_count(1)) == (3, 0)
+    assert (voting.present_voter_count(2), voting.absent_voter_count(2)) == (2, 1)
+    assert (voting.present_voter_count(), voting.absent_voter_count()) == (2, 1)
+
+    voting_voter.absent_from_round = 1
+    voting_voter.save()
+    assert voting.absence_counts == {"1": 1}
+    voting_voter.delete()
+    assert (voting.voter_count, voting.absence_counts) == (2, {})
+
+    VotingVoter.objects.bulk_create(
+        VotingVoter(voting=voting, voter=make_voter(member_id), absent_from_round=1)
+        for member_id in range(10, 15)
+    )
+    assert (voting.voter_count, voting.absence_counts) == (7, {"1": 5})
+    voting.voting_voters.filter(voter__member_id__gte=10).update(absent_from_round=None)
+    voting.voting_voters.filter(voter__member_id=10).delete()
+    voting.refresh_from_db()
+    assert (voting.voter_count, voting.absence_counts) == (6, {})
+
+
+@pytest.mark.django_db
+def test_voter_counts_follow_deleted_voters(voting):
+    round = voting.new_round()
+    # Cascades through the deletion collector, as in the admin
+    Voter.objects.get(member_id=2).delete()
+    voting.refresh_from_db()
+    assert (voting.voter_count, voting.absence_counts) == (1, {})
+
+    Vote.objects.create(voting_round=round, member_id=1, amount=Decimal("100"))
+    round.refresh_from_db()
+    assert round.active is False
+
+    Voter.objects.filter(member_id=1).delete()
+    voting.refresh_from_db()
+    assert voting.voter_count == 0
+
+
+@pytest.mark.django_db
+def test_voting_save_does_not_overwrite_voter_counts(voting):
+    stale = Voting.objects.get(pk=voting.pk)
+    VotingVoter.objects.create(voting=voting, voter=make_voter(3), absent_from_round=1)
+    stale.name = "Renamed"
+    stale.save()
+    stale.refresh_from_db()
+    assert (stale.voter_count, stale.absence_counts) == (3, {"1": 1})
+
+
+@pytest.mark.django_db
+def test_voting_info_without_count_queries(voting, django_assert_num_queries):
+    VotingVoter.objects.create(voting=voting, voter=make_voter(3), absent_from_round=1)
+    voting.new_round()
+    voting = Voting.objects.get(pk=voting.pk)
+    # Only the active round is looked up
+    with django_assert_num_queries(1):
+        content = Template("{% load voting %}{% voting_info voting=voting %}").render(
+            Context(dict(voting=voting))
+        )
+    assert "<td>2</td>" in content
+    assert "<td>1</td>" in content
+
+
+# ---------------------------------------------------------------------------
+# Memoized active round
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.django_db
+def test_active_round_resolved_once(voting, django_assert_num_queries):
+    round = voting.new_round()
+    voting = Voting.objects.get(pk=voting.pk)
+    # All of them come from the round list
+    with django_assert_num_queries(1):
+        assert voting.active_round == round
+        assert voting.active_or_last_round == round
+        assert [r.is_active_or_last for r in voting.round_list] == [True]
+
+
+@pytest.mark.django_db
+def test_active_round_invalidated_by_round_changes(voting):
+    first = voting.new_round()
+    assert voting.active_round == first
+    cast_votes(voting.active_round, [50, 50])
+    assert voting.active_round is None
+    assert voting.active_or_last_round == first
+    second = voting.new_round()
+    assert voting.active_round == voting.active_or_last_round == second
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("round_count", [1, 4])
+def test_round_info_query_count_independent_of_rounds(
+    voting, round_count, django_assert_num_queries
+):
+    for _ in range(round_count):
+        cast_votes(voting.new_round(), [50, 50])
+    voting = Voting.objects.get(pk=voting.pk)
+    # Only the round list, budget results are computed from the loaded tally
+    with django_assert_num_queries(1):
+        content = Template("{% load voting %}{% round_info voting=voting %}").render(
+            Context(dict(voting=voting))
+        )
+    assert content.count("bx-check-circle") == round_count
+
+
+# ---------------------------------------------------------------------------
+# Server-Sent Events
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize(
+    "old, new, expected_events",
+    [
+        ({}, {}, []),
+        ({}, {1: (True, 0)}, ["round-started"]),
+        ({}, {1: (True, 2)}, ["round-started", "vote-cast"]),
+        ({}, {1: (False, 2)}, ["round-started", "vote-cast", "round-completed"]),
+        ({1: (True, 1)}, {1: (True, 1)}, []),
+        ({1: (True, 1)}, {1: (True, 2)}, ["vote-cast"]),
+        ({1: (True, 1)}, {1: (False, 2)}, ["vote-cast", "round-completed"]),
+        ({1: (False, 2)}, {1: (False, 2), 2: (True, 0)}, ["round-started"]),
+    ],
+)
+def test_diff_round_states(old, new, expected_events):
+    assert [event for event, _ in diff_round_states(old, new)] == expected_events
+
+
+@pytest.mark.django_db
+def test_fetch_round_states(voting):
+    round = voting.new_round()
+    cast_votes(round, [10])
+    assert fetch_round_states(voting.id) == {round.id: (True, 1)}
+
+
+@pytest.mark.django_db
+def test_voting_events_unknown_voting(client):
+    response = client.get(reverse("voting:events", args=["00000000-0000-0000-0000-000000000000"]))
+    assert response.status_code == 404
+
+
+# ---------------------------------------------------------------------------
+# Conditional GET on live fragments
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "url_name, headers",
+    [
+        ("voting:manage", {}),
+        ("voting:info", {"HTTP_HX_TRIGGER": "round-info"}),
+        ("voting:vote", {}),
+    ],
+)
+def test_live_fragment_not_modified(client, owner, voting, url_name, headers):
+    client.force_login(owner)
+    round = voting.new_round()
+    url = reverse(url_name, args=[voting.id])
+    headers = {"HTTP_HX_REQUEST": "true", **headers}
+
+    response = client.get(url, **headers)
+    assert response.status_code == 200
+    etag = response["ETag"]
+    assert "HX-Request" in response["Vary"]
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag, **headers)
+    assert response.status_code == 304
+
+    cast_votes(round, [10])
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag, **headers)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_state_token_tracks_changes_that_keep_counts(voting):
+    VotingVoter.objects.create(voting=voting, voter=make_voter(3), absent_from_round=2)
+    tokens = {Voting.state_token(voting.id)}
+
+    # Move the absence to another voter, the count and the sum stay the same
+    voting.voting_voters.filter(voter__member_id=3).update(absent_from_round=None)
+    voting.voting_voters.filter(voter__member_id=2).update(absent_from_round=2)
+    tokens.add(Voting.state_token(voting.id))
+    # Replace a voter with another one
+    voting.voting_voters.get(voter__member_id=3).delete()
+    VotingVoter.objects.create(voting=voting, voter=make_voter(4))
+    tokens.add(Voting.state_token(voting.id))
+
+    round = voting.new_round()
+    tokens.add(Voting.state_token(voting.id))
+    vote = Vote.objects.create(voting_round=round, member_id=1, amount=Decimal("10"))
+    tokens.add(Voting.state_token(voting.id))
+    vote.amount = Decimal("20")
+    vote.save()
+    tokens.add(Voting.state_token(voting.id))
+    voting.budget_goal = Decimal("500")
+    voting.save()
+    tokens.add(Voting.state_token(voting.id))
+    assert len(tokens) == 7
+
+
+@pytest.mark.django_db
+def test_live_fragment_manage_redirects_other_users(client, owner, voting):
+    client.force_login(owner)
+    url = reverse("voting:manage", args=[voting.id])
+    etag = client.get(url, HTTP_HX_REQUEST="true")["ETag"]
+
+    client.force_login(User.objects.create_user("other"))
+    response = client.get(url, HTTP_HX_REQUEST="true", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 302
+
+
+@pytest.mark.django_db
+def test_live_fragment_etag_only_for_htmx(client, owner, voting):
+    client.force_login(owner)
+    response = client.get(reverse("voting:manage", args=[voting.id]))
+    assert response.status_code == 200
+    assert "ETag" not in response
+
+
+# ---------------------------------------------------------------------------
+# Bulk bid import
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.django_db
+def test_bids_import_csv_bulk(
+    voting, django_assert_max_num_queries, django_capture_on_commit_callbacks
+):
+    make_voter(1000, "Known Voter")
+    csv_lines = [f"{member_id},10,20,30" for member_id in range(1000, 1200)]
+    with django_capture_on_commit_callbacks() as callbacks:
+        # SQLite splits the bid and voter inserts into batches, the roster is recounted once
+        with django_assert_max_num_queries(15):
+            voting.import_bids_csv(csv_lines)
+    assert voting.bids.count() == 600
+    assert voting.voting_voters.filter(absent_from_round=1).count() == 200
+    assert Voter.objects.get(member_id=1000).name == "Known Voter"
+    assert Voter.objects.get(member_id=1001).name == "Mitglied 1001"
+    # A single batched sync job instead of one per voter
+    assert len(callbacks) == 1
+
+
+@pytest.mark.django_db
+def test_bids_import_csv_keeps_existing_voting_voters(voting):
+    voting.import_bids_csv(["1,10", "500,20"])
+    assert voting.voting_voters.get(voter__member_id=1).absent_from_round is None
+    assert voting.voting_voters.get(voter__member_id=500).absent_from_round == 1
+
+
+@pytest.mark.django_db
+def test_bids_import_csv_invalid_amount(voting):
+    with pytest.raises(ValueError, match="Zeile 2"):
+        voting.import_bids_csv(["500,10", "501,abc"])
+    assert not voting.bids.exists()
+
+
+@pytest.mark.django_db
+def test_apply_absent_votes_bulk(owner, django_assert_max_num_queries):
+    voting = make_voting(owner, voter_count=0, total_count=300, budget_goal=Decimal("1000"))
+    VotingVoter.objects.bulk_create(
+        VotingVoter(voting=voting, voter=make_voter(member_id), absent_from_round=1)
+        for member_id in range(1, 201)
+    )
+    for member_id in range(1, 201, 2):
+        voting.bids.create(member_id=member_id, round_number=1, amount=Decimal("5"))
+        voting.bids.create(member_id=member_id, round_number=3, amount=Decimal("7"))
+    round = voting.rounds.create(round_number=2, active=True)
+
+    with django_assert_max_num_queries(10):
+        round.apply_absent_votes()
+
+    assert round.votes.count() == 200
+    assert round.votes.get(member_id=1).amount == Decimal("5")
+    # No bid -> average of 1000 / 300, rounded to cents
+    assert round.votes.get(member_id=2).amount == Decimal("3.33")
+    assert (round.vote_count, round.absent_vote_count) == (200, 200)
+    assert round.vote_sum == 100 * Decimal("5") + 100 * Decimal("3.33")
+    assert round.is_complete is True
+
+
+# ---------------------------------------------------------------------------
+# Voter management list
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.django_db
+def test_voters_list_query_count_independent_of_roster_size(
+    client, owner, voting, django_assert_max_num_queries
+):
+    client.force_login(owner)
+    VotingVoter.objects.bulk_create(
+        VotingVoter(voting=voting, voter=make_voter(member_id)) for member_id in range(10, 70)
+    )
+    Bid.objects.bulk_create(
+        Bid(voting=voting, member_id=member_id, round_number=1, amount=10)
+        for member_id in range(10, 70)
+    )
+    with django_assert_max_num_queries(12):
+        response = client.get(reverse("voting:voters", args=[voting.id]), HTTP_HX_REQUEST="true")
+    content = response.content.decode()
+    assert "Seite 1 von 2" in content
+    # Roster is sorted by member id, the first page ends before member 58
+    assert "Voter 57" in content
+    assert "Voter 58" not in content
+
+
+@pytest.mark.django_db
+def test_voters_list_pagination_and_filter(client, owner, voting):
+    client.force_login(owner)
+    VotingVoter.objects.bulk_create(
+        VotingVoter(voting=voting, voter=make_voter(member_id)) for member_id in range(10, 70)
+    )
+    url = reverse("voting:voters", args=[voting.id])
+    response = client.get(url, {"page": 2}, HTTP_HX_REQUEST="true")
+    assert "Voter 69" in response.content.decode()
+
+    response = client.get(url, {"q": "Voter 42"}, HTTP_HX_REQUEST="true")
+    content = response.content.decode()
+    assert "Voter 42" in content
+    assert "Voter 43" not in content
+    assert "Seite" not in content
+
+
+# ---------------------------------------------------------------------------
+# Round snapshot for the management view
+# ---------------------------------------------------------------------------
+
+
+def render_manage_round_info(voting_round):
+    return Template("{% load voting %}{% manage_round_info voting_round=voting_round %}").render(
+        Context(dict(voting_round=voting_round))
+    )
+
+
+@pytest.mark.django_db
+def test_round_snapshot_entries(voting):
+    round = voting.new_round()
+    cast_votes(round, [10])
+    snapshot = build_round_snapshot(round)
+    assert [entry["member_id"] for entry in snapshot.voter_entries] == [2, 1]
+    assert snapshot.voter_entries[1]["below_target"] is True
+    assert snapshot.is_active_or_last is True
+    assert snapshot.is_complete is False
+    assert snapshot.budget_result["vote_sum"] == 10
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("voter_count", [2, 40])
+def test_manage_round_info_query_count(owner, voter_count, django_assert_num_queries):
+    voting = make_voting(owner, voter_count=0)
+    VotingVoter.objects.bulk_create(
+        VotingVoter(voting=voting, voter=make_voter(member_id))
+        for member_id in range(1, voter_count + 1)
+    )
+    round = voting.new_round()
+    cast_votes(round, [10] * (voter_count // 2))
+    round = voting.rounds.get()
+    # votes, voting voters and the active round, the voter count is stored on the voting
+    with django_assert_num_queries(3):
+        content = render_manage_round_info(round)
+    assert content.count('class="vote"') == voter_count
+
+
+# ---------------------------------------------------------------------------
+# Round results
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.django_db
+def test_budget_result_without_queries(voting, django_assert_num_queries):
+    round = voting.new_round()
+    cast_votes(round, [10])
+    round = voting.rounds.get()
+    with django_assert_num_queries(0):
+        assert round.budget_result["vote_sum"] == 10
+
+
+@pytest.mark.django_db
+def test_budget_result_follows_votes_and_roster(voting):
+    round = voting.new_round()
+    stale = voting.rounds.get()
+    assert stale.budget_result["vote_sum"] == 0
+    cast_votes(round, [10])
+    assert voting.rounds.get().budget_result["vote_sum"] == 10
+
+    voting.voting_voters.filter(voter__member_id=2).delete()
+    result = Voting.objects.get(pk=voting.pk).rounds.get().budget_result
+    assert result["average_participants"] == 1
+
+
+@pytest.mark.django_db
+def test_budget_result_follows_voting_change(voting):
+    round = voting.new_round()
+    cast_votes(round, [10, 10])
+    assert round.budget_result["success"] is False
+    voting.budget_goal = Decimal("20")
+    voting.save()
+    round = voting.rounds.get()
+    assert round.budget_result["success"] is True
+
+
+# ---------------------------------------------------------------------------
+# Webling export
+# ---------------------------------------------------------------------------
+
+
+def test_webling_member_properties_merges_updates():
+    voted = {"properties": {PROP_MEMBER_ID: 1}}
+    absent = {"properties": {PROP_MEMBER_ID: 2, PROP_MISSING_VOTING_ROUNDS: ["2025-06"]}}
+    votes = {1: 120}
+    assert member_properties(voted, votes, 100, "2026-06") == {PROP_CONTRIBUTION: 120}
+    assert member_properties(absent, votes, 100, "2026-06") == {
+        PROP_CONTRIBUTION: 100,
+        PROP_MISSING_VOTING_ROUNDS: ["2025-06", "2026-06"],
+    }
+
+
+def test_webling_update_members_properties_one_put_per_member():
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request)
+        member_id = int(request.url.path.rsplit("/", 1)[1])
+        return httpx.Response(400 if member_id == 3 else 200)
+
+    properties = {member_id: {PROP_CONTRIBUTION: 100} for member_id in range(1, 6)}
+    with WeblingAPI(
+        "key", "http://webling.test/api/1", transport=httpx.MockTransport(handler)
+    ) as api:
+        results = dict(api.update_members_properties(properties, max_workers=3))
+
+    assert sorted(request.url.path for request in requests) == [
+        f"/api/1/member/{member_id}" for member_id in range(1, 6)
+    ]
+    assert all(request.method == "PUT" for request in requests)
+    assert all(request.headers["apikey"] == "key" for request in requests)
+    assert isinstance(results.pop(3), httpx.HTTPStatusError)
+    assert set(results.values()) == {None}
+
+
+def test_webling_update_members_properties_stops_with_consumer():
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request)
+        return httpx.Response(200)
+
+    properties = {member_id: {PROP_CONTRIBUTION: 100} for member_id in range(1, 201)}
+    with WeblingAPI("key", transport=httpx.MockTransport(handler)) as api:
+        results = api.update_members_properties(properties, max_workers=4)
+        consumed = [next(results) for _ in range(20)]
+        # What a KeyboardInterrupt in the consuming loop does
+        results.close()
+
+    assert len(consumed) == 20
+    assert len(requests) <= 20 + 4
+
+
+def test_webling_api_fetches_members_in_chunks():
+    filters = []
+
+    def handler(request: httpx.Request):
+        filters.append(request.url.params["filter"])
+        if request.url.params["format"] != "full":
+            return httpx.Response(200, json={"objects": [1, 2, 3, 4, 5]})
+        ids = request.url.params["filter"].split("(")[1].rstrip(")").split(",")
+        return httpx.Response(200, json=[{"id": int(i), "properties": {}} for i in ids])
+
+    with WeblingAPI("key", transport=httpx.MockTransport(handler)) as api:
+        assert [m for m, _ in api.iter_members_by_group_id(7, chunk_size=2)] == [1, 2, 3, 4, 5]
+        assert len(list(api.iter_members_by_mitglieder_ids(iter(range(5)), chunk_size=3))) == 5
+
+    assert filters == [
+        "$parents.$id=7",
+        "$id IN (1,2)",
+        "$id IN (3,4)",
+        "$id IN (5)",
+        "`Mitglieder ID` IN (0,1,2)",
+        "`Mitglieder ID` IN (3,4)",
+    ]
+
+
+def test_async_webling_api_gathers_updates():
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request)
+        if request.method == "GET":
+            return httpx.Response(200, json={"objects": [42]})
+        return httpx.Response(503 if request.url.path.endswith("/3") else 200)
+
+    async def run():
+        async with AsyncWeblingAPI(
+            "key", transport=httpx.MockTransport(handler), max_retries=1, backoff=0
+        ) as api:
+            member_id = await api.get_member_id_by_mitglieder_id(1)
+            results = await api.update_members_properties(
+                {member_id: {PROP_CONTRIBUTION: 100} for member_id in range(1, 6)}
+            )
+        return member_id, results, api.metrics
+
+    member_id, results, metrics = asyncio.run(run())
+    assert member_id == 42
+    assert isinstance(results.pop(3), httpx.HTTPStatusError)
+    assert results == {1: None, 2: None, 4: None, 5: None}
+    assert metrics.retries == 1
+    assert len(requests) == 7
+
+
+@pytest.mark.django_db
+def test_webling_export_journal_resumes(voting):
+    round = voting.new_round()
+    properties = {101: {PROP_CONTRIBUTION: 100}, 102: {PROP_CONTRIBUTION: 120}, 103: {}}
+    assert WeblingExportEntry.start(round, properties) == properties
+    WeblingExportEntry.finish(round, [101, 102], {103: "Server error"})
+    assert dict(round.webling_export_entries.values_list("webling_id", "status")) == {
+        101: WeblingExportEntry.Status.DONE,
+        102: WeblingExportEntry.Status.DONE,
+        103: WeblingExportEntry.Status.FAILED,
+    }
+
+    # Failed and changed members are exported again
+    properties[102] = {PROP_CONTRIBUTION: 90}
+    assert WeblingExportEntry.start(round, properties) == {102: properties[102], 103: {}}
+    assert round.webling_export_entries.get(webling_id=103).status == "pending"
+
+
+def webling_api_responding(*responses, **kwargs):
+    """A `WeblingAPI` whose requests receive `responses` in order."""
+    responses = iter(responses)
+
+    def handler(request: httpx.Request):
+        response = next(responses)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    return WeblingAPI(
+        "key", transport=httpx.MockTransport(handler), backoff=0, max_retries=2, **kwargs
+    )
+
+
+def test_webling_api_retries_transient_failures():
+    with webling_api_responding(
+        httpx.Response(503),
+        httpx.ConnectTimeout("timeout"),
+        httpx.Response(200, json=[]),
+    ) as api:
+        assert api.fetch_membergroups() == {}
+    assert len(api.metrics.durations) == 3
+    assert api.metrics.retries == 2
+    assert api.metrics.failures == 0
+
+
+def test_webling_api_gives_up_after_max_retries():
+    with webling_api_responding(*[httpx.Response(429)] * 3) as api:
+        with pytest.raises(httpx.HTTPStatusError):
+            api.update_member_contribution(1, 100)
+    assert api.metrics.retries == 2
+    assert api.metrics.failures == 1
+
+
+def test_webling_api_does_not_retry_group_creation_on_server_error():
+    with webling_api_responding(httpx.Response(200, json=[]), httpx.Response(502)) as api:
+        with pytest.raises(httpx.HTTPStatusError):
+            api.create_member_group([1, 2], "Test")
+    assert api.metrics.retries == 0
+
+
+# ---------------------------------------------------------------------------
+# Webling import
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.django_db
+def test_voter_sync_creates_and_updates_changed_voters():
+    make_voter(1, "Alice")
+    make_voter(2, "Bob")
+    Voter.objects.filter(member_id=1).update(webling_id=101)
+    assert Voter.sync({1: "Alice", 2: "Robert", 3: "Carol"}, {1: 101, 2: 102, 3: 103}) == (1, 1)
+    assert list(Voter.objects.values_list("member_id", "name", "webling_id")) == [
+        (1, "Alice", 101),
+        (2, "Robert", 102),
+        (3, "Carol", 103),
+    ]
+
+
+@pytest.mark.django_db
+def test_voter_sync_unchanged_is_single_query(django_assert_num_queries):
+    for member_id in range(1, 101):
+        make_voter(member_id)
+    Voter.objects.update(webling_id=F("member_id") + 1000)
+    with django_assert_num_queries(1):
+        assert Voter.sync(
+            {i: f"Voter {i}" for i in range(1, 101)}, {i: i + 1000 for i in range(1, 101)}
+        ) == (0, 0)
+
+
+# ---------------------------------------------------------------------------
+# Member assembly participation
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.django_db
+def test_participation_changes_coalesce_into_one_flush(
+    settings, voting, django_capture_on_commit_callbacks
+):
+    from django_tasks import default_task_backend
+
+    settings.TASKS = {"default": {"BACKEND": "django_tasks.backends.dummy.DummyBackend"}}
+    with django_capture_on_commit_callbacks(execute=True):
+        for member_id in range(10, 110):
+            VotingVoter.objects.create(voting=voting, voter=make_voter(member_id))
+    assert len(default_task_backend.results) == 1
+    assert default_task_backend.results[0].task.name == "flush_member_assembly_participation"
+    assert default_task_backend.results[0].task.run_after is not None
+
+
+@pytest.mark.django_db
+def test_flush_participation_writes_pending_with_one_lookup(settings, monkeypatch, voting):
+    settings.WEBLING_API_KEY = "key"
+    VotingVoter.objects.filter(voter__member_id=2).update(absent_from_round=1)
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request)
+        if request.method == "GET":
+            members = [{"id": 100 + i, "properties": {PROP_MEMBER_ID: i}} for i in (1, 2)]
+            return httpx.Response(200, json=members)
+        return httpx.Response(400 if request.url.path.endswith("/101") else 200)
+
+    monkeypatch.setattr(
+        "voting.tasks.WeblingAPI",
+        lambda *args: WeblingAPI(*args, transport=httpx.MockTransport(handler)),
+    )
+    flush_member_assembly_participation.call()
+
+    assert [request.method for request in requests].count("GET") == 1
+    assert {
+        request.url.path: json.loads(request.content)
+        for request in requests
+        if request.method == "PUT"
+    } == {
+        "/api/1/member/101": {"properties": {"MV Teilnahme": "Ja"}},
+        "/api/1/member/102": {"properties": {"MV Teilnahme": "Nein"}},
+    }
+    assert dict(Voter.objects.values_list("member_id", "webling_id")) == {1: 101, 2: 102}
+    # The failed update stays pending for the next flush
+    assert dict(voting.voting_voters.values_list("voter__member_id", "participation_pending")) == {
+        1: True,
+        2: False,
+    }
+
+
+@pytest.mark.django_db
+def test_flush_participation_skips_lookup_for_known_webling_ids(settings, monkeypatch, voting):
+    settings.WEBLING_API_KEY = "key"
+    Voter.objects.update(webling_id=F("member_id") + 100)
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request)
+        return httpx.Response(200)
+
+    monkeypatch.setattr(
+        "voting.tasks.WeblingAPI",
+        lambda *args: WeblingAPI(*args, transport=httpx.MockTransport(handler)),
+    )
+    flush_member_assembly_participation.call()
+
+    assert sorted((request.method, request.url.path) for request in requests) == [
+        ("PUT", "/api/1/member/101"),
+        ("PUT", "/api/1/member/102"),
+    ]
+
+
+@pytest.mark.django_db
+def test_flush_participation_forgets_unknown_webling_ids(settings, monkeypatch, voting):
+    settings.WEBLING_API_KEY = "key"
+    Voter.objects.update(webling_id=F("member_id") + 100)
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request)
+        if request.method == "GET":
+            return httpx.Response(200, json=[{"id": 201, "properties": {PROP_MEMBER_ID: 1}}])
+        # Member 1 has been re-created in Webling with a new id
+        return httpx.Response(404 if request.url.path.endswith("/101") else 200)
+
+    monkeypatch.setattr(
+        "voting.tasks.WeblingAPI",
+        lambda *args: WeblingAPI(*args, transport=httpx.MockTransport(handler)),
+    )
+    flush_member_assembly_participation.call()
+    assert dict(Voter.objects.values_list("member_id", "webling_id")) == {1: None, 2: 102}
+    assert voting.voting_voters.get(voter__member_id=1).participation_pending is True
+
+    flush_member_assembly_participation.call()
+    assert dict(Voter.objects.values_list("member_id", "webling_id")) == {1: 201, 2: 102}
+    assert voting.voting_voters.get(voter__member_id=1).participation_pending is False
+    assert requests[-1].url.path == "/api/1/member/201"
+
+
+@pytest.mark.django_db
+def test_flush_participation_writes_most_recent_change(settings, monkeypatch, owner, voting):
+    settings.WEBLING_API_KEY = "key"
+    Voter.objects.update(webling_id=F("member_id") + 100)
+    VotingVoter.objects.update(participation_pending=False)
+    other = make_voting(owner, voter_count=1)
+    # The newer voting has the higher id but holds the older change
+    other.voting_voters.get(voter__member_id=1).save()
+    first = voting.voting_voters.get(voter__member_id=1)
+    first.absent_from_round = 1
+    first.save()
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request)
+        return httpx.Response(200)
+
+    monkeypatch.setattr(
+        "voting.tasks.WeblingAPI",
+        lambda *args: WeblingAPI(*args, transport=httpx.MockTransport(handler)),
+    )
+    flush_member_assembly_participation.call()
+
+    assert [json.loads(request.content) for request in requests] == [
+        {"properties": {"MV Teilnahme": "Nein"}}
+    ]
+    # The older change is superseded by the one written
+    assert not VotingVoter.objects.filter(participation_pending=True).exists()
+
+
+@pytest.mark.django_db
+def test_flush_participation_keeps_changes_made_meanwhile(settings, monkeypatch, voting):
+    settings.WEBLING_API_KEY = "key"
+    Voter.objects.update(webling_id=F("member_id") + 100)
+
+    def handler(request: httpx.Request):
+        if request.url.path.endswith("/101"):
+            # Member 1 is marked absent while the flush is running
+            VotingVoter.objects.filter(voter__member_id=1).update(
+                absent_from_round=1, participation_changed_at=timezone.now()
+            )
+        return httpx.Response(200)
+
+    monkeypatch.setattr(
+        "voting.tasks.WeblingAPI",
+        lambda *args: WeblingAPI(*args, transport=httpx.MockTransport(handler)),
+    )
+    flush_member_assembly_participation.call()
+    assert dict(voting.voting_voters.values_list("voter__member_id", "participation_pending")) == {
+        1: True,
+        2: False,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Round completion
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.django_db
+def test_last_vote_closes_round(voting):
+    round = voting.new_round()
+    Vote.objects.create(voting_round=round, member_id=1, amount=50)
+    assert VotingRound.objects.get(pk=round.pk).active is True
+    vote = Vote.objects.create(voting_round=round, member_id=2, amount=50)
+    assert round.active is False
+    assert VotingRound.objects.get(pk=round.pk).active is False
+
+    # Removing a vote again doesn't reopen the round
+    vote.delete()
+    assert VotingRound.objects.get(pk=round.pk).active is False
+
+
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="Needs row locks, run on Postgres")
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_votes_complete_round_exactly_once(owner):
+    """Run with ``--ds=bieterrunde.settings_test_postgres``."""
+    voter_count = 40
+    voting = make_voting(owner, voter_count=voter_count, total_count=voter_count)
+    round = voting.new_round()
+
+    def cast(member_id):
+        try:
+            VotingRound.cast_vote(voting.id, round.id, member_id, Decimal("10"))
+            return True
+        except ValueError:
+            return False
+        finally:
+            connection.close()
+
+    # Every member votes twice at the same time, only one of each pair may count
+    member_ids = [member_id for member_id in range(1, voter_count + 1) for _ in range(2)]
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(cast, member_ids))
+
+    round.refresh_from_db()
+    assert results.count(True) == voter_count
+    assert round.votes.count() == round.vote_count == voter_count
+    assert round.vote_sum == voter_count * 10
+    assert round.active is False
+    assert voting.new_round().round_number == 2
+
+
+# ---------------------------------------------------------------------------
+# Query plans
+# ---------------------------------------------------------------------------
+
+
+def seed_query_plan_data(owners=10, votings_per_owner=5, voter_count=200):
+    """Spread data over many votings, so that an index is the only sensible plan."""
+    voters = Voter.objects.bulk_create(
+        Voter(member_id=member_id, name=f"Voter {member_id}")
+        for member_id in range(1, voter_count + 1)
+    )
+    for owner_number in range(owners):
+        owner = User.objects.create_user(f"owner-{owner_number}")
+        for _ in range(votings_per_owner):
+            voting = Voting.objects.create(
+                name="Plan",
+                budget_goal=Decimal(100 * voter_count),
+                total_count=voter_count,
+                owner=owner,
+                date=timezone.now(),
+            )
+            VotingVoter.objects.bulk_create(
+                VotingVoter(
+                    voting=voting,
+                    voter=voter,
+                    absent_from_round=1 if voter.member_id % 10 == 0 else None,
+                    participation_pending=False,
+                )
+                for voter in voters
+            )
+            Bid.objects.bulk_create(
+                Bid(voting=voting, member_id=voter.member_id, round_number=1, amount=90)
+                for voter in voters
+                if voter.member_id % 10 == 0
+            )
+            voting_round = voting.rounds.create(round_number=1, active=True)
+            Vote.objects.bulk_create(
+                Vote(voting_round=voting_round, member_id=voter.member_id, amount=100)
+                for voter in voters
+            )
+    return owner, voting, voting_round
+
+
+def assert_uses_index(queryset):
+    plan = queryset.explain()
+    if connection.vendor == "postgresql":
+        assert "Seq Scan" not in plan, plan
+    else:
+        # SQLite reports full table scans as "SCAN <table>" without "USING ... INDEX"
+        assert not re.search(r"SCAN \w+$", plan, re.MULTILINE), plan
+
+
+@pytest.mark.django_db
+def test_hot_queries_use_indexes():
+    owner, voting, voting_round = seed_query_plan_data()
+    VotingVoter.objects.filter(voting=voting, voter__member_id__lte=3).update(
+        participation_pending=True
+    )
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+    assert_uses_index(Voting.objects.filter(owner=owner))
+    assert_uses_index(voting.bids.filter(member_id=10))
+    assert_uses_index(
+        voting.voting_voters.filter(absent_from_round__isnull=False, absent_from_round__lte=1)
+    )
+    assert_uses_index(voting.rounds.filter(active=True))
+    assert_uses_index(voting.rounds.order_by("-round_number")[:1])
+    assert_uses_index(Vote.objects.filter(voting_round=voting_round))
+    assert_uses_index(voting_round.votes.filter(member_id=1))
+    assert_uses_index(VotingVoter.objects.filter(participation_pending=True).order_by("id"))
+
+
+# ---------------------------------------------------------------------------
+# Cached round fragments
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.django_db
+def test_manage_page_caches_past_rounds(client, owner, voting):
+    client.force_login(owner)
+    for _ in range(3):
+        cast_votes(voting.new_round(), [50, 50])
+    url = reverse("voting:manage", args=[voting.id])
+    with CaptureQueriesContext(connection) as first:
+        content = client.get(url).content.decode()
+    with CaptureQueriesContext(connection) as second:
+        cached_content = client.get(url).content.decode()
+    assert cached_content.count('class="vote"') == content.count('class="vote"') == 6
+    # Votes and voting voters of both past rounds
+    assert len(second) == len(first) - 4
+    assert content.count("pico-background-red") == 0
+
+    # A new budget goal changes the version, so past rounds are rendered again
+    voting.budget_goal = Decimal("1000")
+    voting.save()
+    assert client.get(url).content.decode().count("pico-background-red") == 3
@@ -23,8 +23,14 @@ urlpatterns = [
     path("manage/<uuid:voting_id>/export/", views.voting_export, name="export"),
     path("manage/<uuid:voting_id>/export/<int:round_id>/", views.voting_export, name="export"),
     path("info/<uuid:voting_id>", views.voting_info, name="info"),
+    path("events/<uuid:voting_id>", views.voting_events, name="events"),
     path("vote/<uuid:voting_id>", views.voting_vote, name="vote"),
     path("vote/<uuid:voting_id>/<int:voting_round_id>/", views.voting_vote, name="vote"),
+    path(
+        "vote/<uuid:voting_id>/<int:voting_round_id>/submit/",
+        views.voting_vote_submit,
+        name="vote-submit",
+    ),
     path(
         "registration/<uuid:voting_id>/<int:member_id>/<str:auth_token>/",
         views.voter_registration,
@@ -1,14 +1,40 @@
-from dataclasses import dataclass
+import asyncio
+import random
+import statistics
+import threading
+import time
+from collections.abc import AsyncIterator, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from importlib.util import find_spec
+from itertools import islice
+from logging import getLogger
 
 import httpx
-from more_itertools import first
+from more_itertools import chunked, first
+
+log = getLogger(__name__)
 
 PROP_BIETERRUNDE_AUTH_TOKEN = "Bieterrunden-Auth-Token"
 PROP_MEMBER_ID = "Mitglieder ID"
 PROP_MISSING_VOTING_ROUNDS = "Fehlendes Bieterrunden-Gebot"
+PROP_CONTRIBUTION = "Mitgliederbeitrag"
+PROP_ASSEMBLY_PARTICIPATION = "MV Teilnahme"
 
 API_BASE = "https://owm.webling.ch/api/1"
 
+# HTTP/2 multiplexes the concurrent export requests over a single connection, but needs `h2`
+HTTP2_AVAILABLE = find_spec("h2") is not None
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+TIMEOUT = httpx.Timeout(30, connect=10)
+# Members fetched per request, keeps responses small and filter URLs short
+MEMBER_CHUNK_SIZE = 200
+
+
+def assembly_participation_properties(participation: bool | None) -> dict:
+    return {PROP_ASSEMBLY_PARTICIPATION: {None: "", True: "Ja", False: "Nein"}.get(participation)}
+
 
 @dataclass
 class WeblingGroup:
@@ -18,67 +44,311 @@ class WeblingGroup:
     parent_group_id: int | None = None
 
 
-class WeblingAPI:
-    def __init__(self, api_key: str):
+class TokenBucket:
+    """Thread safe token bucket allowing bursts of `burst` calls at `rate` calls per second."""
+
+    def __init__(self, rate: float | None, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token and return how many seconds to wait before using it."""
+        if not self.rate:
+            return 0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Going negative reserves the token, later callers queue up behind us
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0
+
+    def acquire(self) -> None:
+        if wait := self.reserve():
+            time.sleep(wait)
+
+    async def aacquire(self) -> None:
+        if wait := self.reserve():
+            await asyncio.sleep(wait)
+
+
+@dataclass
+class RequestMetrics:
+    """Timings of all requests made by a Webling API client."""
+
+    durations: list[float] = field(default_factory=list)
+    retries: int = 0
+    failures: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, duration: float) -> None:
+        with self._lock:
+            self.durations.append(duration)
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+
+    def summary(self) -> str:
+        if not self.durations:
+            return "no requests"
+        if len(self.durations) > 1:
+            percentiles = statistics.quantiles(self.durations, n=100, method="inclusive")
+            p50, p99 = percentiles[49], percentiles[98]
+        else:
+            p50 = p99 = self.durations[0]
+        return (
+            f"{len(self.durations)} requests, {self.retries} retries, {self.failures} failed, "
+            f"p50 {p50 * 1000:.0f}ms, p99 {p99 * 1000:.0f}ms"
+        )
+
+
+def parse_membergroups(data: list[dict]) -> dict[int, WeblingGroup]:
+    return {
+        group["id"]: WeblingGroup(
+            group_id=group["id"],
+            title=group["properties"]["title"],
+            members=group.get("children", {}).get("member", []),
+            parent_group_id=first(group.get("parents", []), None),
+        )
+        for group in data
+    }
+
+
+def in_filter(field: str, values: list[int]) -> str:
+    return f"{field} IN ({','.join(str(value) for value in values)})"
+
+
+def member_ids_by_mitglieder_id(members: dict[int, dict]) -> dict[int, int]:
+    return {
+        member["properties"][PROP_MEMBER_ID]: member_id for member_id, member in members.items()
+    }
+
+
+def new_membergroup(
+    existing_groups: dict[int, WeblingGroup],
+    member_ids: list[int],
+    title: str,
+    parent_group_id: int | None,
+) -> dict:
+    """Validate and return the payload to create a member group."""
+    if parent_group_id and parent_group_id not in existing_groups:
+        raise ValueError(f"Parent group {parent_group_id} does not exist")
+    title_to_id = {group.title: group.group_id for group in existing_groups.values()}
+    if existing_id := title_to_id.get(title):
+        raise ValueError(f"Group with title {title} already exists (ID: {existing_id})")
+    return {
+        "type": "membergroup",
+        "readonly": False,
+        "properties": {"title": title},
+        "children": {"member": member_ids},
+        **({"parents": [parent_group_id]} if parent_group_id else {}),
+    }
+
+
+class BaseWeblingAPI:
+    """Configuration, throttling and retry policy shared by the sync and async clients.
+
+    Requests share one pooled connection, are throttled by a token bucket and retried with
+    exponential backoff on rate limiting, server and connection errors.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = API_BASE,
+        transport: httpx.BaseTransport | httpx.AsyncBaseTransport | None = None,
+        requests_per_second: float | None = None,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        max_connections: int = 10,
+    ):
         self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.transport = transport
+        self.rate_limiter = TokenBucket(requests_per_second, burst=max_connections)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_connections = max_connections
+        self.metrics = RequestMetrics()
+
+    def _client_options(self) -> dict:
+        return dict(
+            base_url=self.base_url,
+            headers={"apikey": self.api_key},
+            transport=self.transport,
+            http2=HTTP2_AVAILABLE,
+            timeout=TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+        )
+
+    def _should_retry(
+        self,
+        method: str,
+        attempt: int,
+        response: httpx.Response | None,
+        error: httpx.TransportError | None,
+    ) -> bool:
+        if attempt >= self.max_retries:
+            return False
+        if error:
+            # Creating a group isn't idempotent, only retry if the request wasn't sent
+            return method != "POST" or isinstance(error, httpx.ConnectError)
+        return response.status_code in RETRY_STATUS_CODES and (
+            method != "POST" or response.status_code == 429
+        )
+
+    def _result(
+        self, response: httpx.Response | None, error: httpx.TransportError | None
+    ) -> httpx.Response:
+        if error or response.is_error:
+            self.metrics.record_failure()
+        if error:
+            raise error
+        response.raise_for_status()
+        return response
+
+    def _prepare_retry(
+        self,
+        method: str,
+        path: str,
+        attempt: int,
+        response: httpx.Response | None,
+        error: httpx.TransportError | None,
+    ) -> float:
+        self.metrics.record_retry()
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = float(retry_after)
+        else:
+            # Full jitter keeps concurrent workers from retrying in lockstep
+            delay = random.uniform(0, self.backoff * 2**attempt)
+        log.warning(
+            f"{method} {path} failed ({error or response.status_code}), retrying in {delay:.1f}s"
+        )
+        return delay
+
+
+class WeblingAPI(BaseWeblingAPI):
+    """Client for the Webling API."""
 
     def __enter__(self):
-        self.client = httpx.Client()
+        self.client = httpx.Client(**self._client_options())
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.client.close()
+        log.info(f"Webling API: {self.metrics.summary()}")
 
-    def fetch_membergroups(self) -> dict[int, WeblingGroup]:
-        response = self.client.get(
-            f"{API_BASE}/membergroup", headers={"apikey": self.api_key}, params={"format": "full"}
-        )
-        response.raise_for_status()
+    def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """Send a request, retrying transient failures, and raise for error responses."""
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            start = time.monotonic()
+            response, error = None, None
+            try:
+                response = self.client.request(method, path, **kwargs)
+            except httpx.TransportError as e:
+                error = e
+            finally:
+                self.metrics.record(time.monotonic() - start)
+            if not self._should_retry(method, attempt, response, error):
+                return self._result(response, error)
+            time.sleep(self._prepare_retry(method, path, attempt, response, error))
+            attempt += 1
 
-        return {
-            group["id"]: WeblingGroup(
-                group_id=group["id"],
-                title=group["properties"]["title"],
-                members=group.get("children", {}).get("member", []),
-                parent_group_id=first(group.get("parents", []), None),
-            )
-            for group in response.json()
-        }
+    def fetch_membergroups(self) -> dict[int, WeblingGroup]:
+        response = self.request("GET", "/membergroup", params={"format": "full"})
+        return parse_membergroups(response.json())
 
     def fetch_members_by_filter(
         self, filter: str, full: bool = True
     ) -> dict[int, dict] | list[int]:
-        response = self.client.get(
-            f"{API_BASE}/member",
-            headers={"apikey": self.api_key},
-            params={"format": "full" if full else "", "filter": filter},
+        response = self.request(
+            "GET", "/member", params={"format": "full" if full else "", "filter": filter}
         )
-        response.raise_for_status()
         if full:
             return {member["id"]: member for member in response.json()}
         else:
             return response.json().get("objects", [])
 
     def fetch_members_by_group_id(self, parent_group: int) -> dict[int, dict]:
-        result = self.fetch_members_by_filter(f"$parents.$id={parent_group}")
-        assert isinstance(result, dict)  # make typecheck happy
-        return result
+        return dict(self.iter_members_by_group_id(parent_group))
+
+    def iter_members_by_filter(
+        self, filter: str, chunk_size: int = MEMBER_CHUNK_SIZE
+    ) -> Iterator[tuple[int, dict]]:
+        """Yield ``(member_id, member)`` for all members matching `filter`.
+
+        Only the ids are fetched at once, the members follow in chunks of `chunk_size`.
+        """
+        member_ids = self.fetch_members_by_filter(filter, full=False)
+        for chunk in chunked(member_ids, chunk_size):
+            members = self.fetch_members_by_filter(in_filter("$id", chunk))
+            assert isinstance(members, dict)  # make typecheck happy
+            yield from members.items()
+
+    def iter_members_by_group_id(
+        self, parent_group: int, chunk_size: int = MEMBER_CHUNK_SIZE
+    ) -> Iterator[tuple[int, dict]]:
+        return self.iter_members_by_filter(f"$parents.$id={parent_group}", chunk_size)
+
+    def iter_members_by_mitglieder_ids(
+        self, mitglieder_ids: Iterable[int], chunk_size: int = MEMBER_CHUNK_SIZE
+    ) -> Iterator[tuple[int, dict]]:
+        """Yield ``(member_id, member)`` for all existing `mitglieder_ids`, in chunks."""
+        for chunk in chunked(mitglieder_ids, chunk_size):
+            members = self.fetch_members_by_filter(in_filter("`Mitglieder ID`", chunk))
+            assert isinstance(members, dict)  # make typecheck happy
+            yield from members.items()
+
+    def update_member_properties(self, member_id: int, properties: dict) -> None:
+        self.request("PUT", f"/member/{member_id}", json={"properties": properties})
+
+    def update_members_properties(
+        self,
+        properties_by_member: dict[int, dict],
+        max_workers: int = 8,
+    ) -> Iterator[tuple[int, Exception | None]]:
+        """Update many members concurrently, one PUT per member.
+
+        Yields ``(member_id, error)`` in completion order, `error` is `None` on success. A failed
+        member doesn't stop the remaining updates, but once the caller stops consuming (e.g. on
+        Ctrl-C) only the updates already in flight are sent.
+        """
+        members = iter(properties_by_member.items())
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        futures = {}
+        try:
+            while True:
+                # At most one update per worker is submitted ahead of the consumer
+                for member_id, properties in islice(members, max_workers - len(futures)):
+                    future = executor.submit(self.update_member_properties, member_id, properties)
+                    futures[future] = member_id
+                if not futures:
+                    return
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield futures.pop(future), future.exception()
+        finally:
+            executor.shutdown(cancel_futures=True)
 
     def update_member_contribution(self, member_id: int, contribution: int):
-        response = self.client.put(
-            f"{API_BASE}/member/{member_id}",
-            headers={"apikey": self.api_key},
-            json={"properties": {"Mitgliederbeitrag": contribution}},
-        )
-        response.raise_for_status()
+        self.update_member_properties(member_id, {PROP_CONTRIBUTION: contribution})
 
     def set_member_non_voting(self, member_id: int, keys_to_set: list[str]):
-        response = self.client.put(
-            f"{API_BASE}/member/{member_id}",
-            headers={"apikey": self.api_key},
-            json={"properties": {"Fehlendes Bieterrunden-Gebot": keys_to_set}},
-        )
-        response.raise_for_status()
+        self.update_member_properties(member_id, {PROP_MISSING_VOTING_ROUNDS: keys_to_set})
 
     def get_member_id_by_mitglieder_id(self, mitglieder_id: int) -> int:
         ids = self.fetch_members_by_filter(f"`Mitglieder ID` = {mitglieder_id}", full=False)
@@ -87,50 +357,169 @@ class WeblingAPI:
         assert isinstance(ids, list)  # make typecheck happy
         return ids[0]
 
-    def update_member_auth_token(self, member_id: int, token: str) -> None:
-        response = self.client.put(
-            f"{API_BASE}/member/{member_id}",
-            headers={"apikey": self.api_key},
-            json={"properties": {PROP_BIETERRUNDE_AUTH_TOKEN: token}},
+    def get_member_ids_by_mitglieder_ids(self, mitglieder_ids: Iterable[int]) -> dict[int, int]:
+        """Return ``{mitglieder_id: member_id}`` for all existing `mitglieder_ids`."""
+        return member_ids_by_mitglieder_id(
+            dict(self.iter_members_by_mitglieder_ids(mitglieder_ids))
         )
-        response.raise_for_status()
+
+    def update_member_auth_token(self, member_id: int, token: str) -> None:
+        self.update_member_properties(member_id, {PROP_BIETERRUNDE_AUTH_TOKEN: token})
 
     def update_member_assembly_participation(
         self, member_id: int, participation: bool | None
     ) -> None:
-        response = self.client.put(
-            f"{API_BASE}/member/{member_id}",
-            headers={"apikey": self.api_key},
-            json={
-                "properties": {
-                    "MV Teilnahme": {None: "", True: "Ja", False: "Nein"}.get(participation)
-                }
-            },
-        )
-        response.raise_for_status()
+        self.update_member_properties(member_id, assembly_participation_properties(participation))
 
     def create_member_group(
         self, member_ids: list[int], title: str, parent_group_id: int | None = None
     ) -> int:
-        exising_groups = self.fetch_membergroups()
-        if parent_group_id and parent_group_id not in exising_groups:
-            raise ValueError(f"Parent group {parent_group_id} does not exist")
-        title_to_id = {
-            exising_group.title: exising_group.group_id
-            for exising_group in exising_groups.values()
+        payload = new_membergroup(self.fetch_membergroups(), member_ids, title, parent_group_id)
+        return self.request("POST", "/membergroup", json=payload).json()
+
+
+class AsyncWeblingAPI(BaseWeblingAPI):
+    """Async client for the Webling API, for use from ASGI views and async tasks.
+
+    Mirrors `WeblingAPI`, use ``async with AsyncWeblingAPI(...) as api``.
+    """
+
+    async def __aenter__(self):
+        self.client = httpx.AsyncClient(**self._client_options())
+        # Bounds the number of requests waiting for a pooled connection
+        self._semaphore = asyncio.Semaphore(self.max_connections)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.client.aclose()
+        log.info(f"Webling API: {self.metrics.summary()}")
+
+    async def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """Send a request, retrying transient failures, and raise for error responses."""
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                await self.rate_limiter.aacquire()
+                start = time.monotonic()
+                response, error = None, None
+                try:
+                    response = await self.client.request(method, path, **kwargs)
+                except httpx.TransportError as e:
+                    error = e
+                finally:
+                    self.metrics.record(time.monotonic() - start)
+            if not self._should_retry(method, attempt, response, error):
+                return self._result(response, error)
+            await asyncio.sleep(self._prepare_retry(method, path, attempt, response, error))
+            attempt += 1
+
+    async def fetch_membergroups(self) -> dict[int, WeblingGroup]:
+        response = await self.request("GET", "/membergroup", params={"format": "full"})
+        return parse_membergroups(response.json())
+
+    async def fetch_members_by_filter(
+        self, filter: str, full: bool = True
+    ) -> dict[int, dict] | list[int]:
+        response = await self.request(
+            "GET", "/member", params={"format": "full" if full else "", "filter": filter}
+        )
+        if full:
+            return {member["id"]: member for member in response.json()}
+        else:
+            return response.json().get("objects", [])
+
+    async def fetch_members_by_group_id(self, parent_group: int) -> dict[int, dict]:
+        return {
+            member_id: member
+            async for member_id, member in self.iter_members_by_group_id(parent_group)
         }
-        if existing_id := title_to_id.get(title):
-            raise ValueError(f"Group with title {title} already exists (ID: {existing_id})")
-        response = self.client.post(
-            f"{API_BASE}/membergroup",
-            headers={"apikey": self.api_key},
-            json={
-                "type": "membergroup",
-                "readonly": False,
-                "properties": {"title": title},
-                "children": {"member": member_ids},
-                **({"parents": [parent_group_id]} if parent_group_id else {}),
-            },
+
+    async def iter_members_by_filter(
+        self, filter: str, chunk_size: int = MEMBER_CHUNK_SIZE
+    ) -> AsyncIterator[tuple[int, dict]]:
+        """Yield ``(member_id, member)`` for all members matching `filter`.
+
+        Only the ids are fetched at once, the members follow in chunks of `chunk_size`.
+        """
+        member_ids = await self.fetch_members_by_filter(filter, full=False)
+        for chunk in chunked(member_ids, chunk_size):
+            members = await self.fetch_members_by_filter(in_filter("$id", chunk))
+            assert isinstance(members, dict)  # make typecheck happy
+            for item in members.items():
+                yield item
+
+    def iter_members_by_group_id(
+        self, parent_group: int, chunk_size: int = MEMBER_CHUNK_SIZE
+    ) -> AsyncIterator[tuple[int, dict]]:
+        return self.iter_members_by_filter(f"$parents.$id={parent_group}", chunk_size)
+
+    async def iter_members_by_mitglieder_ids(
+        self, mitglieder_ids: Iterable[int], chunk_size: int = MEMBER_CHUNK_SIZE
+    ) -> AsyncIterator[tuple[int, dict]]:
+        """Yield ``(member_id, member)`` for all existing `mitglieder_ids`, in chunks."""
+        for chunk in chunked(mitglieder_ids, chunk_size):
+            members = await self.fetch_members_by_filter(in_filter("`Mitglieder ID`", chunk))
+            assert isinstance(members, dict)  # make typecheck happy
+            for item in members.items():
+                yield item
+
+    async def update_member_properties(self, member_id: int, properties: dict) -> None:
+        await self.request("PUT", f"/member/{member_id}", json={"properties": properties})
+
+    async def update_members_properties(
+        self, properties_by_member: dict[int, dict]
+    ) -> dict[int, Exception | None]:
+        """Update many members concurrently, one PUT per member.
+
+        Returns ``{member_id: error}``, `error` is `None` on success. A failed member doesn't
+        stop the remaining updates.
+        """
+        results = await asyncio.gather(
+            *(
+                self.update_member_properties(member_id, properties)
+                for member_id, properties in properties_by_member.items()
+            ),
+            return_exceptions=True,
         )
-        response.raise_for_status()
-        return response.json()
+        return dict(zip(properties_by_member, results))
+
+    async def update_member_contribution(self, member_id: int, contribution: int):
+        await self.update_member_properties(member_id, {PROP_CONTRIBUTION: contribution})
+
+    async def set_member_non_voting(self, member_id: int, keys_to_set: list[str]):
+        await self.update_member_properties(member_id, {PROP_MISSING_VOTING_ROUNDS: keys_to_set})
+
+    async def get_member_id_by_mitglieder_id(self, mitglieder_id: int) -> int:
+        ids = await self.fetch_members_by_filter(f"`Mitglieder ID` = {mitglieder_id}", full=False)
+        if len(ids) != 1:
+            raise ValueError(f"Mitglieder ID {mitglieder_id} does not exist")
+        assert isinstance(ids, list)  # make typecheck happy
+        return ids[0]
+
+    async def get_member_ids_by_mitglieder_ids(
+        self, mitglieder_ids: Iterable[int]
+    ) -> dict[int, int]:
+        """Return ``{mitglieder_id: member_id}`` for all existing `mitglieder_ids`."""
+        members = {
+            member_id: member
+            async for member_id, member in self.iter_members_by_mitglieder_ids(mitglieder_ids)
+        }
+        return member_ids_by_mitglieder_id(members)
+
+    async def update_member_auth_token(self, member_id: int, token: str) -> None:
+        await self.update_member_properties(member_id, {PROP_BIETERRUNDE_AUTH_TOKEN: token})
+
+    async def update_member_assembly_participation(
+        self, member_id: int, participation: bool | None
+    ) -> None:
+        await self.update_member_properties(
+            member_id, assembly_participation_properties(participation)
+        )
+
+    async def create_member_group(
+        self, member_ids: list[int], title: str, parent_group_id: int | None = None
+    ) -> int:
+        payload = new_membergroup(
+            await self.fetch_membergroups(), member_ids, title, parent_group_id
+        )
+        return (await self.request("POST", "/membergroup", json=payload)).json()
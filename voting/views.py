@@ -1,19 +1,28 @@
 import random
 import string
 from csv import DictWriter
+from functools import partial
 from http import HTTPStatus
 
 from django.conf import settings
 from django.contrib import messages
+from django.contrib.messages import get_messages
+from django.core.paginator import Paginator
 from django.db import IntegrityError
-from django.http import HttpResponse, HttpResponseForbidden
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.http import Http404, HttpResponse, HttpResponseForbidden, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.utils import timezone
 from django.utils.formats import localize
 from django.utils.text import slugify
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
+from django.views.decorators.vary import vary_on_headers
 from django_htmx.http import HttpResponseClientRefresh
 from guest_user.decorators import allow_guest_user
 
+from voting.events import RoundEventHub
 from voting.forms import (
     VotingForm,
     VoteForm,
@@ -35,6 +44,31 @@ def get_voting_or_index(request, voting_id):
     return voting
 
 
+def live_fragment_etag(request, voting_id, voting_round_id=None, owner_only=False):
+    """ETag for the htmx fragments refreshed on round events, `None` disables it."""
+    if request.method != "GET" or not request.htmx:
+        return None
+    if len(get_messages(request)):
+        # Pending messages are delivered with the fragment, don't swallow them
+        return None
+    token = Voting.state_token(voting_id, owner=request.user if owner_only else None)
+    if token is None:
+        return None
+    return f"{token}-{voting_round_id or 0}"
+
+
+def live_fragment(view=None, *, owner_only=False):
+    """Answer unchanged htmx fragment requests with `304 Not Modified`.
+
+    With `owner_only`, other users never get an ETag, so the view can turn them away.
+    """
+    if view is None:
+        return partial(live_fragment, owner_only=owner_only)
+    view = condition(etag_func=partial(live_fragment_etag, owner_only=owner_only))(view)
+    view = vary_on_headers("HX-Request")(view)
+    return cache_control(no_cache=True)(view)
+
+
 def index(request):
     votings = Voting.objects.filter(owner=request.user) if request.user.is_authenticated else []
     return render(request, "voting/index.html", dict(votings=votings))
@@ -62,6 +96,7 @@ def voting_create(request):
 
 
 @allow_guest_user()
+@live_fragment(owner_only=True)
 def voting_manage(request, voting_id):
     voting = get_voting_or_index(request, voting_id)
     if isinstance(voting, HttpResponse):
@@ -71,6 +106,7 @@ def voting_manage(request, voting_id):
     return render(request, "voting/voting_manage.html", dict(voting=voting))
 
 
+@live_fragment
 def voting_info(request, voting_id):
     voting = Voting.objects.get(pk=voting_id)
     if request.htmx:
@@ -83,6 +119,17 @@ def voting_info(request, voting_id):
     )
 
 
+async def voting_events(request, voting_id):
+    """Server-Sent Events stream announcing round starts, votes and round completions."""
+    if not await Voting.objects.filter(pk=voting_id).aexists():
+        raise Http404("Voting not found")
+    return StreamingHttpResponse(
+        RoundEventHub.for_current_loop().stream(voting_id),
+        content_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @allow_guest_user()
 def voting_import_bids(request, voting_id):
     if not request.htmx:
@@ -128,37 +175,57 @@ def voting_new_round(request, voting_id):
     return redirect("voting:manage", voting.id)
 
 
+@live_fragment
 def voting_vote(request, voting_id, voting_round_id=None):
+    if request.method == "POST":
+        return voting_vote_submit(request, voting_id, voting_round_id)
     voting = Voting.objects.get(pk=voting_id)
     active_round = voting.active_round
-    if request.method == "POST":
-        form = VoteForm(request.POST)
-        voting_round = VotingRound.objects.get(pk=voting_round_id)
-        if not voting_round.is_complete:
-            if form.is_valid():
-                vote = form.save(commit=False)
-                assert vote.voting_round == voting_round == active_round
-                vote.save()
-                if voting_round.is_complete:
-                    voting_round.active = False
-                    voting_round.save()
-                messages.success(request, "Deine Stimme wurde gespeichert.")
-                return redirect("voting:vote", voting.id)
-        return render(request, "voting/voting_vote.html", dict(voting=voting, form=form))
-    else:
-        if request.htmx and active_round and active_round.id == voting_round_id:
-            # If it's an htmx request with the same round id as the active one (meaning the user hasn't sent the form yet)
-            # return 204 to prevent the form from being replaced (and potentially losing user input)
-            return HttpResponse(status=HTTPStatus.NO_CONTENT)
-        return render(
-            request,
-            "voting/voting_vote.html",
-            dict(
-                voting=voting,
-                form=VoteForm(initial={"voting_round": active_round}),
-                cb="".join(random.choices(string.ascii_letters + string.digits, k=10)),
-            ),
-        )
+    if request.htmx and active_round and active_round.id == voting_round_id:
+        # If it's an htmx request with the same round id as the active one (meaning the user hasn't sent the form yet)
+        # return 204 to prevent the form from being replaced (and potentially losing user input)
+        return HttpResponse(status=HTTPStatus.NO_CONTENT)
+    return render(
+        request,
+        "voting/voting_vote.html",
+        dict(
+            voting=voting,
+            active_round=active_round,
+            form=VoteForm(),
+            cb="".join(random.choices(string.ascii_letters + string.digits, k=10)),
+        ),
+    )
+
+
+@require_POST
+def voting_vote_submit(request, voting_id, voting_round_id):
+    """Cast a vote, htmx requests get the refreshed vote form fragment back."""
+    form = VoteForm(request.POST)
+    if form.is_valid():
+        try:
+            vote = VotingRound.cast_vote(voting_id, voting_round_id, **form.cleaned_data)
+        except ValueError as e:
+            messages.error(request, str(e))
+        else:
+            messages.success(request, "Deine Stimme wurde gespeichert.")
+            if not request.htmx:
+                return redirect("voting:vote", voting_id)
+            # The last vote closes the round
+            voting_round = vote.voting_round
+            return render(
+                request,
+                "voting/htmx/vote_form.html",
+                dict(
+                    voting=voting_round.voting,
+                    active_round=voting_round if voting_round.active else None,
+                    form=VoteForm(),
+                ),
+            )
+    voting = get_object_or_404(Voting, pk=voting_id)
+    template = "voting/htmx/vote_form.html" if request.htmx else "voting/voting_vote.html"
+    return render(
+        request, template, dict(voting=voting, active_round=voting.active_round, form=form)
+    )
 
 
 @allow_guest_user()
@@ -192,20 +259,33 @@ def voting_export(request, voting_id: str, round_id: int = None):
     return response
 
 
+VOTERS_PAGE_SIZE = 50
+
+
 def _render_voters_list(request, voting):
+    bid_count = (
+        Bid.objects.filter(voting=voting, member_id=OuterRef("voter__member_id"))
+        .order_by()
+        .values("member_id")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
     voting_voters = (
         VotingVoter.objects.filter(voting=voting)
         .select_related("voter")
+        .annotate(bid_count=Coalesce(Subquery(bid_count), 0))
         .order_by("voter__member_id")
     )
-    voter_list = []
-    for vv in voting_voters:
-        vv.bid_count = Bid.objects.filter(voting=voting, member_id=vv.voter.member_id).count()
-        voter_list.append(vv)
+    query = request.GET.get("q", "").strip()
+    if query:
+        voting_voters = voting_voters.filter(
+            Q(voter__name__icontains=query) | Q(voter__member_id__contains=query)
+        )
+    page = Paginator(voting_voters, VOTERS_PAGE_SIZE).get_page(request.GET.get("page"))
     return render(
         request,
         "voting/htmx/manage_voters.html",
-        dict(voting=voting, voting_voters=voter_list, open=True),
+        dict(voting=voting, voting_voters=page, query=query, open=True),
     )
 
 